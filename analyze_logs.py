@@ -1,7 +1,11 @@
-import sys
 import os
 import json
+import math
+import heapq
+import hashlib
 import logging
+import argparse
+from datetime import datetime, timezone
 from collections import defaultdict
 
 # Logging ko configure karo taaki warnings aur errors stderr pe print ho
@@ -59,15 +63,245 @@ def parse_log_line(line):
         logging.warning(f"Galat formatted line skip ho rahi hai: {line.strip()} | Error: {e}")
         return None
 
-def process_log_files(file_paths):
+class TDigest:
     """
-    Multiple log files process karta hai aur test flow aur API failure ka data aggregate karta hai.
-    Ek dictionary return karta hai jo aggregated report contain karti hai.
+    Streaming quantile sketch (merging t-digest).
+    Memory sirf `compression` ke proportional rehti hai (lagbhag `compression` centroids + ek chhota buffer),
+    chahe kitni bhi values add ki jaayein. Tails (p95/p99) par accuracy sabse zyada hoti hai.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.centroids = []  # Sorted [mean, weight] pairs
+        self.buffer = []  # Abhi tak merge na hue (value, weight) points
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        """Ek value sketch me add karta hai."""
+        self.buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        # Buffer bhar gaya toh centroids me merge karo taaki memory bounded rahe
+        if len(self.buffer) >= self.compression * 5:
+            self._compress()
+
+    def _k_inverse(self, k):
+        # Scale function k(q) = delta / (2*pi) * asin(2q - 1) ka inverse
+        k = min(k, self.compression / 4.0)
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _compress(self):
+        """Buffer aur existing centroids ko ek sorted pass me merge karta hai."""
+        if not self.buffer:
+            return
+        points = sorted(self.centroids + [[v, w] for v, w in self.buffer])
+        self.buffer = []
+        total = float(self.count)
+
+        merged = []
+        q0 = 0.0
+        q_limit = self._k_inverse(self._k(q0) + 1)
+        mean, weight = points[0]
+        for value, w in points[1:]:
+            q = q0 + (weight + w) / total
+            if q <= q_limit:
+                # Same centroid me merge karo (weighted mean)
+                weight += w
+                mean += (value - mean) * w / weight
+            else:
+                merged.append([mean, weight])
+                q0 += weight / total
+                q_limit = self._k_inverse(self._k(q0) + 1)
+                mean, weight = value, w
+        merged.append([mean, weight])
+        self.centroids = merged
+
+    def quantile(self, q):
+        """q (0-1) quantile ka estimate return karta hai, agar koi value nahi hai toh None."""
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+
+        target = q * self.count
+        # Har centroid ka center cumulative weight me kahaan padta hai
+        cumulative = 0.0
+        prev_center, prev_mean = 0.0, self.min
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2.0
+            if target <= center:
+                if center == prev_center:
+                    return mean
+                fraction = (target - prev_center) / (center - prev_center)
+                return prev_mean + fraction * (mean - prev_mean)
+            prev_center, prev_mean = center, mean
+            cumulative += weight
+
+        # Last centroid ke center ke baad max tak interpolate karo
+        if self.count == prev_center:
+            return self.max
+        fraction = (target - prev_center) / (self.count - prev_center)
+        return prev_mean + fraction * (self.max - prev_mean)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters sketch: sirf `capacity` counters rakhta hai.
+    Har reported count true count se zyada ho sakta hai, lekin `error` se zyada nahi,
+    aur error hamesha <= N / capacity hota hai (N = total weight).
+    Jiska true count N / capacity se zyada hai wo item guaranteed list me hoga.
+    Sabse chhota counter ek lazy min-heap se milta hai, isliye har event amortized O(log capacity) hai.
+    """
+
+    def __init__(self, capacity=100):
+        if capacity <= 0:
+            raise ValueError("capacity positive hona chahiye")
+        self.capacity = capacity
+        self.counters = {}  # item -> [count, error]
+        # Har counter ki ek (count, item) entry; count purana (kam) ho sakta hai, eviction par theek hota hai
+        self.heap = []
+        self.total = 0
+
+    def add(self, item, weight=1):
+        self.total += weight
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+            heapq.heappush(self.heap, (weight, item))
+        else:
+            # Heap top stale ho toh uski current count ke saath wapas daalo, jab tak sahi minimum na mile
+            while True:
+                count, victim = self.heap[0]
+                current = self.counters[victim][0]
+                if current == count:
+                    break
+                heapq.heapreplace(self.heap, (current, victim))
+            # Sabse chhote counter ko evict karo aur naya item uski count inherit karega
+            min_count = self.counters.pop(victim)[0]
+            self.counters[item] = [min_count + weight, min_count]
+            heapq.heapreplace(self.heap, (min_count + weight, item))
+
+    def top(self, k):
+        """Top-k items (count ke descending order me) with count aur max overestimation error."""
+        ranked = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:k]
+        return [{"item": item, "count": count, "error": error} for item, (count, error) in ranked]
+
+    def error_bound(self):
+        return self.total / self.capacity
+
+
+class HyperLogLog:
+    """
+    Distinct items ka cardinality estimate, fixed 2^precision bytes memory me.
+    Relative standard error lagbhag 1.04 / sqrt(2^precision) hota hai (precision=14 par ~0.81%).
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision 4 aur 18 ke beech hona chahiye")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        if self.m >= 128:
+            self.alpha = 0.7213 / (1 + 1.079 / self.m)
+        else:
+            self.alpha = {16: 0.673, 32: 0.697, 64: 0.709}[self.m]
+
+    def add(self, item):
+        # 64-bit hash: upar ke `precision` bits register choose karte hain, baaki se leading zeros
+        x = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+        index = x >> (64 - self.precision)
+        remaining = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        estimate = self.alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Chhoti cardinalities ke liye linear counting zyada accurate hai
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+
+def parse_timestamp(timestamp):
+    """
+    ISO timestamp string ko naive UTC datetime me convert karta hai, galat format par None return karta hai.
+    Offset wale timestamps UTC me convert hote hain aur bina offset wale UTC maane jaate hain,
+    taaki mixed logs me bhi comparison (min/max, sorting) TypeError na de.
+    """
+    try:
+        ts = datetime.fromisoformat(timestamp.strip())
+    except (ValueError, AttributeError):
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def window_start(ts, window_seconds):
+    """Tumbling window ka start (ISO string) return karta hai jisme ye timestamp padta hai."""
+    epoch = ts.replace(tzinfo=timezone.utc).timestamp()
+    bucket = math.floor(epoch / window_seconds) * window_seconds
+    return datetime.fromtimestamp(bucket, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def update_flow_timeline(timelines, flow_id, ts, api_endpoint, step_latencies):
+    """
+    Flow ki timeline ko ek naye (timestamp, endpoint) event se update karta hai.
+    Har flow ke liye sirf first/last/previous timestamps aur sabse slow step rakhe jaate hain,
+    aur consecutive API calls ke beech ki latency turant `step_latencies` sketch me chali jaati hai,
+    taaki memory events ke nahi, sirf flows ke proportional rahe.
+    """
+    timeline = timelines.get(flow_id)
+    if timeline is None:
+        timelines[flow_id] = {
+            "start": ts, "end": ts, "prev": ts, "prev_api": api_endpoint,
+            "steps": 0, "slowest_step": None
+        }
+        return
+    timeline["start"] = min(timeline["start"], ts)
+    timeline["end"] = max(timeline["end"], ts)
+    latency = (ts - timeline["prev"]).total_seconds()
+    # Log order me peeche ka event (out-of-order line) step latency nahi banata
+    if latency >= 0:
+        step = {"from": timeline["prev_api"], "to": api_endpoint, "latency_seconds": latency}
+        step_latencies.add(latency)
+        timeline["steps"] += 1
+        if timeline["slowest_step"] is None or latency > timeline["slowest_step"]["latency_seconds"]:
+            timeline["slowest_step"] = step
+    timeline["prev"], timeline["prev_api"] = ts, api_endpoint
+
+
+def finish_flow_timeline(timeline):
+    """Flow timeline state ko report format me convert karta hai: start/end, duration aur step summary."""
+    return {
+        "start": timeline["start"].isoformat(),
+        "end": timeline["end"].isoformat(),
+        "duration_seconds": (timeline["end"] - timeline["start"]).total_seconds(),
+        "steps": timeline["steps"],
+        "slowest_step": timeline["slowest_step"]
+    }
+
+
+def iter_log_entries(file_paths):
+    """
+    Saari log files ko line-by-line padhta hai aur har valid parsed entry yield karta hai.
+    Missing files aur galat lines ko log karke skip karta hai, memory me kuch bhi buffer nahi karta.
     """
-    flows = {}  # Flow ID ka mapping jisme failure count aur failed APIs ki list hogi
-    api_failures = defaultdict(int)  # Har API endpoint ke failures count karta hai
-    
-    # Har file process karo
     for file_path in file_paths:
         if not os.path.exists(file_path):
             logging.error(f"File nahi mili: {file_path}")
@@ -80,23 +314,57 @@ def process_log_files(file_paths):
                     entry = parse_log_line(line)
                     if entry is None:
                         continue  # Agar line parsing fail hui toh skip karo
-                    flow_id = entry["flow_id"]
-                    # Agar ye flow pehli baar mila toh initialize karo
-                    if flow_id not in flows:
-                        flows[flow_id] = {
-                            "total_calls": 0,
-                            "failed_calls": 0,
-                            "failed_api_details": defaultdict(int)
-                        }
-                    flows[flow_id]["total_calls"] += 1
-                    # Agar API call fail hui toh failure count update karo
-                    if entry["status"] == "FAILED":
-                        flows[flow_id]["failed_calls"] += 1
-                        flows[flow_id]["failed_api_details"][entry["api_endpoint"]] += 1
-                        api_failures[entry["api_endpoint"]] += 1
+                    yield entry
         except Exception as e:
             logging.error(f"File read karne me error: {file_path} | Error: {e}")
+
+
+def update_window(windows, ts, window_seconds, status):
+    """Timestamp wali tumbling window ke total aur failed call counts update karta hai."""
+    window = windows[window_start(ts, window_seconds)]
+    window["total_calls"] += 1
+    if status == "FAILED":
+        window["failed_calls"] += 1
+
+
+def process_log_files(file_paths, window_seconds=300, compression=100):
+    """
+    Multiple log files process karta hai aur test flow aur API failure ka data aggregate karta hai.
+    Failures ko `window_seconds` ki tumbling windows me bucket karta hai aur flow durations aur
+    step latencies ke p50/p95/p99 bounded-memory t-digests se nikalta hai. Har flow ka sirf
+    constant-size timeline state rakha jaata hai, individual events store nahi hote.
+    Ek dictionary return karta hai jo aggregated report contain karti hai.
+    """
+    flows = {}  # Flow ID ka mapping jisme failure count aur failed APIs ki list hogi
+    api_failures = defaultdict(int)  # Har API endpoint ke failures count karta hai
+    flow_state = {}  # Har flow ka first/last/previous timestamp, timeline ke liye
+    step_latencies = TDigest(compression)  # Consecutive API calls ke beech ki latency, stream hote hi
+    windows = defaultdict(lambda: {"total_calls": 0, "failed_calls": 0})  # Tumbling window counts
     
+    # Har file ki har valid entry process karo
+    for entry in iter_log_entries(file_paths):
+        flow_id = entry["flow_id"]
+        # Agar ye flow pehli baar mila toh initialize karo
+        if flow_id not in flows:
+            flows[flow_id] = {
+                "total_calls": 0,
+                "failed_calls": 0,
+                "failed_api_details": defaultdict(int)
+            }
+        flows[flow_id]["total_calls"] += 1
+        # Agar API call fail hui toh failure count update karo
+        if entry["status"] == "FAILED":
+            flows[flow_id]["failed_calls"] += 1
+            flows[flow_id]["failed_api_details"][entry["api_endpoint"]] += 1
+            api_failures[entry["api_endpoint"]] += 1
+
+        # Timestamp ko parse karke timeline aur time window update karo
+        ts = parse_timestamp(entry["timestamp"])
+        if ts is None:
+            continue
+        update_flow_timeline(flow_state, flow_id, ts, entry["api_endpoint"], step_latencies)
+        update_window(windows, ts, window_seconds, entry["status"])
+
     # Flow ka overall status determine karo
     total_flows = len(flows)
     failed_flows = {fid: details for fid, details in flows.items() if details["failed_calls"] > 0}
@@ -117,6 +385,14 @@ def process_log_files(file_paths):
             max_api_failures = count
             top_failed_api = api
 
+    # Har flow ki timeline banao aur uski duration ko quantile sketch me daalo
+    flow_timelines = {}
+    durations = TDigest(compression)
+    for fid, state in flow_state.items():
+        timeline = finish_flow_timeline(state)
+        flow_timelines[fid] = timeline
+        durations.add(timeline["duration_seconds"])
+
     # Final report banaye
     report = {
         "total_flows": total_flows,
@@ -131,21 +407,130 @@ def process_log_files(file_paths):
         "top_failed_api": {
             "api_endpoint": top_failed_api,
             "failure_count": max_api_failures
-        } if top_failed_api is not None else {}
+        } if top_failed_api is not None else {},
+        "window_seconds": window_seconds,
+        "failure_windows": [
+            {"window_start": start, **counts} for start, counts in sorted(windows.items())
+        ],
+        "flow_timelines": flow_timelines,
+        "flow_duration_percentiles": {
+            "p50": durations.quantile(0.50),
+            "p95": durations.quantile(0.95),
+            "p99": durations.quantile(0.99)
+        },
+        "step_latency_percentiles": {
+            "p50": step_latencies.quantile(0.50),
+            "p95": step_latencies.quantile(0.95),
+            "p99": step_latencies.quantile(0.99)
+        }
     }
     
     return report
 
+def process_log_files_sketch(file_paths, window_seconds=300, top_k=10, capacity=1000, precision=14):
+    """
+    `process_log_files` ka fixed-memory version, bahut bade ya high-cardinality log corpora ke liye.
+    Per-flow state nahi rakhta: flows aur endpoints ke failures Space-Saving se top-K me track hote hain
+    aur distinct/failed flow counts HyperLogLog se estimate hote hain. Har estimate ke saath uska error
+    bound report me diya jaata hai. Per-flow timelines aur duration percentiles is mode me nahi bante.
+    """
+    flow_failures = SpaceSaving(capacity)
+    api_failures = SpaceSaving(capacity)
+    distinct_flows = HyperLogLog(precision)
+    failed_flows = HyperLogLog(precision)
+    windows = defaultdict(lambda: {"total_calls": 0, "failed_calls": 0})
+    total_calls = 0
+
+    for entry in iter_log_entries(file_paths):
+        total_calls += 1
+        distinct_flows.add(entry["flow_id"])
+        if entry["status"] == "FAILED":
+            failed_flows.add(entry["flow_id"])
+            flow_failures.add(entry["flow_id"])
+            api_failures.add(entry["api_endpoint"])
+
+        ts = parse_timestamp(entry["timestamp"])
+        if ts is not None:
+            update_window(windows, ts, window_seconds, entry["status"])
+
+    total_flows = distinct_flows.count()
+    failed_flows_count = min(failed_flows.count(), total_flows)
+    top_flows = flow_failures.top(top_k)
+    top_apis = api_failures.top(top_k)
+
+    return {
+        "mode": "sketch",
+        "total_calls": total_calls,
+        "total_flows": total_flows,
+        "passing_flows_count": total_flows - failed_flows_count,
+        "failed_flows_count": failed_flows_count,
+        "top_failed_flows": [
+            {"flow_id": t["item"], "failed_calls": t["count"], "max_overcount": t["error"]} for t in top_flows
+        ],
+        "top_failed_apis": [
+            {"api_endpoint": t["item"], "failure_count": t["count"], "max_overcount": t["error"]} for t in top_apis
+        ],
+        "top_failed_flow": {
+            "flow_id": top_flows[0]["item"],
+            "failed_calls": top_flows[0]["count"]
+        } if top_flows else {},
+        "top_failed_api": {
+            "api_endpoint": top_apis[0]["item"],
+            "failure_count": top_apis[0]["count"]
+        } if top_apis else {},
+        "window_seconds": window_seconds,
+        "failure_windows": [
+            {"window_start": start, **counts} for start, counts in sorted(windows.items())
+        ],
+        "error_bounds": {
+            # Flow counts: relative standard error (~68% confidence), ~3x pe ~99.7%
+            "flow_count_relative_std_error": distinct_flows.relative_error(),
+            # Top-K counts true value se max itna zyada ho sakte hain, kabhi kam nahi
+            "flow_failures_max_overcount": flow_failures.error_bound(),
+            "api_failures_max_overcount": api_failures.error_bound()
+        }
+    }
+
+def positive_int(value):
+    """argparse type: sirf positive integers accept karta hai."""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"positive integer hona chahiye, mila: {value}")
+    return number
+
+
+def hll_precision(value):
+    """argparse type: HyperLogLog precision 4 se 18 ke beech honi chahiye."""
+    number = int(value)
+    if not 4 <= number <= 18:
+        raise argparse.ArgumentTypeError(f"4 aur 18 ke beech hona chahiye, mila: {value}")
+    return number
+
+
 def main():
     """
     Command line arguments process karta hai aur test log report generate karta hai.
     """
-    if len(sys.argv) < 2:
-        print("Usage: python analyze_logs.py <log_file1> [<log_file2> ...]")
-        sys.exit(1)
-    
-    file_paths = sys.argv[1:]
-    report = process_log_files(file_paths)
+    parser = argparse.ArgumentParser(description="Test flow logs analyze karke JSON report banata hai.")
+    parser.add_argument("log_files", nargs="+", help="Log files jinhe analyze karna hai")
+    parser.add_argument("--window", type=positive_int, default=300,
+                        help="Failure counts ke liye tumbling window size (seconds)")
+    parser.add_argument("--compression", type=positive_int, default=100,
+                        help="Duration percentiles ke t-digest ka compression (zyada = accurate, zyada memory)")
+    parser.add_argument("--sketch", action="store_true",
+                        help="Fixed-memory mode: top-K aur HyperLogLog estimates (per-flow details ke bina)")
+    parser.add_argument("--top-k", type=positive_int, default=10, help="Sketch mode me kitne top flows/APIs report karne hain")
+    parser.add_argument("--capacity", type=positive_int, default=1000,
+                        help="Sketch mode me Space-Saving counters (zyada = kam error)")
+    parser.add_argument("--precision", type=hll_precision, default=14,
+                        help="Sketch mode me HyperLogLog precision (registers = 2^precision)")
+    args = parser.parse_args()
+
+    if args.sketch:
+        report = process_log_files_sketch(args.log_files, window_seconds=args.window, top_k=args.top_k,
+                                          capacity=args.capacity, precision=args.precision)
+    else:
+        report = process_log_files(args.log_files, window_seconds=args.window, compression=args.compression)
     
     # Final report ko JSON format me print karo
     print(json.dumps(report, indent=4))
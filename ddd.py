@@ -1,26 +1,140 @@
 import os
+import sys
+import json
 import time
+import shutil
 import hashlib
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import subprocess
 
 class BackupHandler(FileSystemEventHandler):
-    def __init__(self, source_dir, backup_dir):
+    """
+    Collects changed paths and syncs them in batches.
+
+    Events are coalesced until the source has been quiet for `quiet_period`
+    seconds, then a single rsync copies only the dirty paths. Only one sync
+    runs at a time; events that arrive during a sync are picked up by the next one.
+    Stats of the last `log_size` syncs are kept in sync_log.
+    """
+
+    def __init__(self, source_dir, backup_dir, quiet_period=2.0, log_size=1000):
         self.source_dir = source_dir
         self.backup_dir = backup_dir
+        self.quiet_period = quiet_period
+        self.source_root = os.path.abspath(source_dir)
+        if source_dir.endswith(os.sep):
+            self.destination = backup_dir
+        else:
+            # rsync without a trailing slash copies the directory itself into backup_dir
+            self.destination = os.path.join(backup_dir, os.path.basename(self.source_root))
+        self.dirty = set()
+        self.pending_events = 0
+        self.last_event = 0.0
+        self.sync_log = deque(maxlen=log_size)
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.worker = None
+
+    def start(self):
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.worker:
+            self.worker.join()
+
+    def mark_dirty(self, path):
+        relative = os.path.relpath(os.path.abspath(path), self.source_root)
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return
+        with self.condition:
+            self.dirty.add(relative)
+            self.pending_events += 1
+            self.last_event = time.monotonic()
+            self.condition.notify()
 
     def on_modified(self, event):
+        # A directory "modified" event only means a child changed; the child has its own event
         if not event.is_directory:
-            self.perform_backup()
+            self.mark_dirty(event.src_path)
 
     def on_created(self, event):
-        if not event.is_directory:
-            self.perform_backup()
+        self.mark_dirty(event.src_path)
+
+    def on_deleted(self, event):
+        self.mark_dirty(event.src_path)
+
+    def on_moved(self, event):
+        self.mark_dirty(event.src_path)
+        self.mark_dirty(event.dest_path)
 
-    def perform_backup(self):
-        # Use rsync for incremental backup
-        subprocess.run(['rsync', '-av', '--delete', self.source_dir, self.backup_dir])
+    def _take_batch(self):
+        """Wait for a quiet period after the last event, then hand back (paths, event_count)."""
+        with self.condition:
+            while True:
+                if self.dirty:
+                    remaining = self.last_event + self.quiet_period - time.monotonic()
+                    if remaining <= 0 or self.stopping:
+                        break
+                    self.condition.wait(remaining)
+                elif self.stopping:
+                    return None, 0
+                else:
+                    self.condition.wait()
+            paths, events = self.dirty, self.pending_events
+            self.dirty, self.pending_events = set(), 0
+        return prune_nested(paths), events
+
+    def _run(self):
+        while True:
+            paths, events = self._take_batch()
+            if paths is None:
+                return
+            start = time.monotonic()
+            returncode = self.perform_backup(paths)
+            elapsed = time.monotonic() - start
+            self.sync_log.append({
+                "paths": len(paths),
+                "events": events,
+                "seconds": elapsed,
+                "returncode": returncode,
+            })
+            print(f"Synced {len(paths)} paths ({events} events coalesced) in {elapsed:.2f}s")
+
+    def perform_backup(self, paths=None):
+        if paths is None:
+            # Use rsync for a full incremental backup
+            return subprocess.run(['rsync', '-av', '--delete', self.source_dir, self.backup_dir]).returncode
+        # Copy only the dirty paths; directories are synced recursively and
+        # paths that no longer exist in the source are removed from the backup
+        os.makedirs(self.destination, exist_ok=True)
+        file_list = "".join(path + "\0" for path in sorted(paths))
+        command = ['rsync', '-a', '-r', '--delete', '--delete-missing-args', '--force',
+                   '--from0', '--files-from=-', self.source_root + os.sep, self.destination]
+        return subprocess.run(command, input=file_list.encode()).returncode
+
+def prune_nested(paths):
+    """Drop paths whose parent directory is also in the set, since rsync -r covers them."""
+    if os.curdir in paths:
+        return [os.curdir]
+    kept = []
+    for path in sorted(paths):
+        parent = os.path.dirname(path)
+        while parent and parent not in paths:
+            parent = os.path.dirname(parent)
+        if not parent:
+            kept.append(path)
+    return kept
 
 def calculate_file_hash(file_path):
     sha256_hash = hashlib.sha256()
@@ -29,8 +143,181 @@ def calculate_file_hash(file_path):
             sha256_hash.update(byte_block)
     return sha256_hash.hexdigest()
 
-def start_monitoring(source_dir, backup_dir):
-    event_handler = BackupHandler(source_dir, backup_dir)
+class BackupRepository:
+    """
+    Content-addressed backup store on a local directory.
+
+    Layout:
+        objects/ab/abcdef...   file contents, named by their sha256
+        snapshots/<id>.json    manifest of {path: size, mtime_ns, mode, sha256}
+
+    Identical content is stored once no matter how many files or snapshots
+    refer to it. A new backup only hashes files whose size or mtime differ
+    from the previous snapshot of the same source and only adds content
+    that is not in the store yet. Files are hashed while they are copied
+    into the store, so every object always matches its name.
+    """
+
+    def __init__(self, root, workers=8):
+        self.root = root
+        self.workers = workers
+        self.objects_dir = os.path.join(root, "objects")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        self.store_lock = threading.Lock()
+        self.claimed = set()
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def snapshots(self):
+        return sorted(name[:-5] for name in os.listdir(self.snapshots_dir) if name.endswith(".json"))
+
+    def load_snapshot(self, snapshot_id):
+        with open(os.path.join(self.snapshots_dir, snapshot_id + ".json")) as f:
+            return json.load(f)
+
+    def latest_snapshot(self, source):
+        for snapshot_id in reversed(self.snapshots()):
+            snapshot = self.load_snapshot(snapshot_id)
+            if snapshot["source"] == source:
+                return snapshot
+        return None
+
+    def _store(self, path):
+        """
+        Copy path into the object store, hashing the bytes as they are copied.
+
+        The object is named by the digest of exactly the bytes written, so a
+        file that changes mid-copy can never land under a stale digest.
+        Returns (digest, size, bytes stored); bytes stored is 0 when that
+        content was already in the store.
+        """
+        fd, tmp = tempfile.mkstemp(prefix=".incoming-", dir=self.objects_dir)
+        sha256_hash = hashlib.sha256()
+        size = 0
+        try:
+            with open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                for block in iter(lambda: src.read(1024 * 1024), b""):
+                    sha256_hash.update(block)
+                    dst.write(block)
+                    size += len(block)
+            digest = sha256_hash.hexdigest()
+            target = self.object_path(digest)
+            # Claim the digest so two threads backing up identical files store it only once
+            with self.store_lock:
+                if digest in self.claimed or os.path.exists(target):
+                    os.unlink(tmp)
+                    return digest, size, 0
+                self.claimed.add(digest)
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(tmp, target)
+            except OSError:
+                with self.store_lock:
+                    self.claimed.discard(digest)
+                raise
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest, size, size
+
+    def _backup_file(self, path, previous):
+        """Store one file, reusing the previous digest when size and mtime are unchanged and the object exists."""
+        st = os.stat(path)
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "mode": st.st_mode & 0o7777}
+        if (previous and (previous["size"], previous["mtime_ns"]) == (st.st_size, st.st_mtime_ns)
+                and os.path.exists(self.object_path(previous["sha256"]))):
+            entry["sha256"] = previous["sha256"]
+            return entry, False, 0
+        entry["sha256"], entry["size"], copied = self._store(path)
+        return entry, True, copied
+
+    def backup(self, source):
+        """Take a snapshot of source and return (snapshot_id, stats)."""
+        source = os.path.abspath(source)
+        start = time.monotonic()
+        previous = self.latest_snapshot(source)
+        previous_files = previous["files"] if previous else {}
+
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.isfile(path) and not os.path.islink(path):
+                    paths.append(path)
+
+        manifest = {}
+        stats = {"files": 0, "hashed": 0, "stored": 0, "bytes_copied": 0, "errors": 0}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            for path in paths:
+                relative = os.path.relpath(path, source)
+                futures[relative] = pool.submit(self._backup_file, path, previous_files.get(relative))
+            for relative, future in futures.items():
+                try:
+                    entry, hashed, copied = future.result()
+                except OSError as e:
+                    print(f"Could not back up {relative}: {e}")
+                    stats["errors"] += 1
+                    continue
+                manifest[relative] = entry
+                stats["files"] += 1
+                stats["hashed"] += hashed
+                stats["stored"] += copied > 0
+                stats["bytes_copied"] += copied
+
+        snapshot_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        snapshot = {"id": snapshot_id, "source": source, "created": time.time(), "files": manifest}
+        snapshot_path = os.path.join(self.snapshots_dir, snapshot_id + ".json")
+        with open(snapshot_path + ".tmp", "w") as f:
+            json.dump(snapshot, f, indent=1, sort_keys=True)
+        os.replace(snapshot_path + ".tmp", snapshot_path)
+        stats["seconds"] = time.monotonic() - start
+        return snapshot_id, stats
+
+    def _restore_file(self, relative, entry, target, verify):
+        destination = os.path.join(target, relative)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(self.object_path(entry["sha256"]), destination)
+        os.chmod(destination, entry["mode"])
+        os.utime(destination, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+        if verify and calculate_file_hash(destination) != entry["sha256"]:
+            raise OSError(f"checksum mismatch for {relative}")
+        return entry["size"]
+
+    def restore(self, snapshot_id, target, verify=False):
+        """
+        Rebuild every file of a snapshot under target.
+
+        A file that cannot be restored is reported and skipped so the rest
+        still come back. Returns (files restored, bytes restored, errors).
+        """
+        snapshot = self.load_snapshot(snapshot_id)
+        target = os.path.abspath(target)
+        restored = 0
+        total = 0
+        errors = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                relative: pool.submit(self._restore_file, relative, entry, target, verify)
+                for relative, entry in snapshot["files"].items()
+            }
+            for relative, future in futures.items():
+                try:
+                    total += future.result()
+                except OSError as e:
+                    print(f"Could not restore {relative}: {e}")
+                    errors += 1
+                    continue
+                restored += 1
+        return restored, total, errors
+
+def start_monitoring(source_dir, backup_dir, quiet_period=2.0):
+    event_handler = BackupHandler(source_dir, backup_dir, quiet_period=quiet_period)
+    event_handler.start()
     observer = Observer()
     observer.schedule(event_handler, path=source_dir, recursive=True)
     observer.start()
@@ -40,8 +327,63 @@ def start_monitoring(source_dir, backup_dir):
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    event_handler.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up a directory with rsync or the built-in snapshot store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    watch_parser = subparsers.add_parser("watch", help="Watch a directory and rsync changes to a backup directory")
+    watch_parser.add_argument("source")
+    watch_parser.add_argument("backup")
+    watch_parser.add_argument("--quiet-period", type=float, default=2.0,
+                              help="Seconds without events before a sync starts (default: 2)")
+
+    backup_parser = subparsers.add_parser("backup", help="Take a content-addressed snapshot of a directory")
+    backup_parser.add_argument("source")
+    backup_parser.add_argument("repository")
+    backup_parser.add_argument("--workers", type=int, default=8)
+
+    restore_parser = subparsers.add_parser("restore", help="Rebuild a snapshot into a directory")
+    restore_parser.add_argument("repository")
+    restore_parser.add_argument("snapshot", help="Snapshot id, or 'latest'")
+    restore_parser.add_argument("target")
+    restore_parser.add_argument("--workers", type=int, default=8)
+    restore_parser.add_argument("--verify", action="store_true", help="Re-hash every restored file")
+
+    list_parser = subparsers.add_parser("snapshots", help="List snapshots in a repository")
+    list_parser.add_argument("repository")
+
+    args = parser.parse_args()
+
+    if args.command == "watch":
+        start_monitoring(args.source, args.backup, quiet_period=args.quiet_period)
+    elif args.command == "backup":
+        repository = BackupRepository(args.repository, workers=args.workers)
+        snapshot_id, stats = repository.backup(args.source)
+        print(f"Snapshot {snapshot_id}: {stats['files']} files, {stats['hashed']} hashed, "
+              f"{stats['stored']} new objects ({stats['bytes_copied']} bytes) in {stats['seconds']:.2f}s")
+        if stats["errors"]:
+            sys.exit(1)
+    elif args.command == "restore":
+        repository = BackupRepository(args.repository, workers=args.workers)
+        snapshot_id = args.snapshot
+        if snapshot_id == "latest":
+            snapshot_ids = repository.snapshots()
+            if not snapshot_ids:
+                sys.exit("No snapshots in repository")
+            snapshot_id = snapshot_ids[-1]
+        files, total, errors = repository.restore(snapshot_id, args.target, verify=args.verify)
+        print(f"Restored {files} files ({total} bytes) from snapshot {snapshot_id}")
+        if errors:
+            print(f"{errors} files could not be restored")
+            sys.exit(1)
+    elif args.command == "snapshots":
+        repository = BackupRepository(args.repository)
+        for snapshot_id in repository.snapshots():
+            snapshot = repository.load_snapshot(snapshot_id)
+            size = sum(entry["size"] for entry in snapshot["files"].values())
+            print(f"{snapshot_id}  {len(snapshot['files'])} files  {size} bytes  {snapshot['source']}")
 
 if __name__ == "__main__":
-    source_directory = "/path/to/source"
-    backup_directory = "/path/to/backup"
-    start_monitoring(source_directory, backup_directory)
\ No newline at end of file
+    main()
@@ -1,32 +1,332 @@
 import os
+import sys
+import json
+import time
+import errno
+import shutil
+import argparse
+import sqlite3
+import filecmp
 import hashlib
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
-def file_hash(filepath):
-    """Return the MD5 hash of the file specified by filepath."""
-    hash_md5 = hashlib.md5()
+try:
+    import xxhash  # Much faster than BLAKE2 when available
+except ImportError:
+    xxhash = None
+
+try:
+    import fcntl  # Needed for reflinks (Linux only)
+except ImportError:
+    fcntl = None
+
+PARTIAL_BYTES = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+FICLONE = 0x40049409  # ioctl that shares extents between files on btrfs/XFS
+HASH_ALGORITHM = "xxh3_128" if xxhash is not None else "blake2b_128"
+
+
+def new_hasher():
+    """Return a fresh HASH_ALGORITHM hash object: xxh3_128 if xxhash is installed, otherwise BLAKE2b."""
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def file_hash(filepath, stats=None):
+    """Return a fast non-cryptographic hash of the whole file, read in large chunks."""
+    hasher = new_hasher()
     try:
         with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                if stats is not None:
+                    stats["bytes_read"] += len(chunk)
     except IOError:
         print(f"Could not read file: {filepath}")
         return None
-    return hash_md5.hexdigest()
+    return hasher.hexdigest()
+
+
+def partial_hash(filepath, size, stats=None):
+    """Return a hash of the first and last PARTIAL_BYTES of the file (the whole file if it is small)."""
+    hasher = new_hasher()
+    try:
+        with open(filepath, "rb") as f:
+            head = f.read(PARTIAL_BYTES)
+            hasher.update(head)
+            read = len(head)
+            if size > 2 * PARTIAL_BYTES:
+                f.seek(-PARTIAL_BYTES, os.SEEK_END)
+                tail = f.read(PARTIAL_BYTES)
+                hasher.update(tail)
+                read += len(tail)
+            elif size > PARTIAL_BYTES:
+                rest = f.read()
+                hasher.update(rest)
+                read += len(rest)
+    except IOError:
+        print(f"Could not read file: {filepath}")
+        return None
+    if stats is not None:
+        stats["bytes_read"] += read
+    return hasher.hexdigest()
+
+
+class HashCache:
+    """
+    Persistent SQLite cache of file digests keyed by (path, kind).
+
+    Callers put the hash algorithm in kind (e.g. "partial:xxh3_128"), so runs
+    with and without xxhash never read each other's digests.
+
+    A cached digest is only reused while the file's size, mtime_ns and inode
+    still match, so repeated scans of a mostly-unchanged tree only hash new or
+    modified files.
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (path, kind)
+            )
+        """)
+        self.pending = []
+
+    def get(self, path, kind, st):
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, inode, digest FROM file_hashes WHERE path = ? AND kind = ?",
+            (path, kind),
+        ).fetchone()
+        if row and tuple(row[:3]) == (st.st_size, st.st_mtime_ns, st.st_ino):
+            return row[3]
+        return None
+
+    def put(self, path, kind, st, digest):
+        self.pending.append((path, kind, st.st_size, st.st_mtime_ns, st.st_ino, digest))
+        if len(self.pending) >= 1000:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?, ?)", self.pending
+                )
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+class DeviceLimiter:
+    """Caps how many files are read at once from each device (st_dev), so spinning disks do not thrash."""
+
+    def __init__(self, per_device):
+        self.per_device = per_device
+        self.lock = threading.Lock()
+        self.semaphores = {}
+
+    def __call__(self, device):
+        with self.lock:
+            if device not in self.semaphores:
+                self.semaphores[device] = threading.BoundedSemaphore(self.per_device)
+            return self.semaphores[device]
+
+
+class Hasher:
+    """Hashes files on a thread pool, consulting an optional HashCache and recording throughput stats."""
+
+    def __init__(self, threads=8, per_device=2, cache=None, stats=None):
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.limiter = DeviceLimiter(per_device)
+        self.cache = cache
+        self.stats = stats if stats is not None else {}
+        for key in ("bytes_read", "files_hashed", "cache_hits", "hash_seconds"):
+            self.stats.setdefault(key, 0)
+
+    def _job(self, kind, path, st):
+        counter = {"bytes_read": 0}
+        with self.limiter(st.st_dev):
+            if kind == "partial":
+                digest = partial_hash(path, st.st_size, counter)
+            else:
+                digest = file_hash(path, counter)
+        return digest, counter["bytes_read"]
+
+    def hash_all(self, paths, kind, file_stats):
+        """Return {path: digest} for a "partial" or "full" hash of each path; unreadable files map to None."""
+        start = time.perf_counter()
+        digests = {}
+        futures = {}
+        cache_kind = f"{kind}:{HASH_ALGORITHM}"
+        for path in paths:
+            st = file_stats[path]
+            cached = self.cache.get(path, cache_kind, st) if self.cache else None
+            if cached is not None:
+                digests[path] = cached
+                self.stats["cache_hits"] += 1
+            else:
+                futures[path] = self.pool.submit(self._job, kind, path, st)
+        for path, future in futures.items():
+            digest, bytes_read = future.result()
+            digests[path] = digest
+            self.stats["bytes_read"] += bytes_read
+            self.stats["files_hashed"] += 1
+            if digest is not None and self.cache:
+                self.cache.put(path, cache_kind, file_stats[path], digest)
+        self.stats["hash_seconds"] += time.perf_counter() - start
+        return digests
+
+    def close(self):
+        self.pool.shutdown()
+        if self.cache:
+            self.cache.flush()
+
+
+def group_by(paths, key):
+    """Group paths by key(path), dropping None keys and groups with a single member."""
+    groups = defaultdict(list)
+    for path in paths:
+        k = key(path)
+        if k is not None:
+            groups[k].append(path)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def confirm_identical(group, vanished=None):
+    """
+    Split a group of same-hash files into sets that are byte-for-byte identical.
+
+    Files deleted or made unreadable since hashing are dropped and, if
+    vanished is given, appended to it as (path, reason).
+    """
+    confirmed = []
+    for path in group:
+        target = None
+        i = 0
+        while i < len(confirmed):
+            existing = confirmed[i]
+            try:
+                same = filecmp.cmp(existing[0], path, shallow=False)
+            except OSError as e:
+                failed = existing[0] if e.filename == existing[0] else path
+                if vanished is not None:
+                    vanished.append((failed, f"vanished since scan ({e.strerror or e})"))
+                if failed == path:
+                    break
+                # Compare against the set's next member instead
+                existing.pop(0)
+                if not existing:
+                    del confirmed[i]
+                continue
+            if same:
+                target = existing
+                break
+            i += 1
+        else:
+            confirmed.append([path])
+            continue
+        if target is not None:
+            target.append(path)
+    return [g for g in confirmed if len(g) > 1]
 
-def find_duplicates(directory):
-    """Find and print duplicate files in the given directory."""
-    hashes = {}
-    duplicates = []
 
+def duplicate_groups(directory, verify=False, stats=None, threads=8, per_device=2, cache_path=None,
+                     vanished=None):
+    """
+    Return lists of identical files under directory, each in walk order.
+
+    Files are narrowed down in stages so most bytes are never read:
+    1. group by size, since files with a unique size cannot have duplicates;
+    2. hash the first and last 64 KB within same-size groups;
+    3. hash the full content of files that still collide (skipped for files
+       small enough that stage 2 already covered every byte).
+    With verify=True, the final groups are also confirmed with a byte-by-byte compare;
+    files that vanish before it are appended to vanished as (path, reason).
+
+    Hashing runs on `threads` threads with at most `per_device` concurrent reads
+    per device. If cache_path is given, digests are stored there and reused on
+    later runs for files whose size, mtime and inode have not changed.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("bytes_total", 0)
+    stats.setdefault("files", 0)
+    start = time.perf_counter()
+
+    file_stats = {}
     for root, _, files in os.walk(directory):
         for filename in files:
             filepath = os.path.join(root, filename)
-            filehash = file_hash(filepath)
-            if filehash:
-                if filehash in hashes:
-                    duplicates.append((filepath, hashes[filehash]))
-                else:
-                    hashes[filehash] = filepath
+            if os.path.islink(filepath):
+                continue
+            try:
+                file_stats[filepath] = os.stat(filepath)
+            except OSError:
+                print(f"Could not read file: {filepath}")
+                continue
+            stats["files"] += 1
+            stats["bytes_total"] += file_stats[filepath].st_size
+
+    cache = HashCache(cache_path) if cache_path else None
+    hasher = Hasher(threads=threads, per_device=per_device, cache=cache, stats=stats)
+    try:
+        same_size_groups = group_by(file_stats, lambda p: file_stats[p].st_size)
+        result = [group for group in same_size_groups if file_stats[group[0]].st_size == 0]
+        to_hash = [group for group in same_size_groups if file_stats[group[0]].st_size > 0]
+
+        partials = hasher.hash_all([p for group in to_hash for p in group], "partial", file_stats)
+        candidates = []
+        for group in to_hash:
+            candidates.extend(group_by(group, partials.get))
+
+        small = [g for g in candidates if file_stats[g[0]].st_size <= 2 * PARTIAL_BYTES]
+        large = [g for g in candidates if file_stats[g[0]].st_size > 2 * PARTIAL_BYTES]
+        fulls = hasher.hash_all([p for group in large for p in group], "full", file_stats)
+        for group in large:
+            small.extend(group_by(group, fulls.get))
+
+        for group in small:
+            result.extend(confirm_identical(group, vanished) if verify else [group])
+    finally:
+        hasher.close()
+        if cache:
+            cache.close()
+
+    stats["elapsed_seconds"] = time.perf_counter() - start
+    hash_seconds = stats["hash_seconds"] or 1e-9
+    stats["files_per_second"] = stats["files_hashed"] / hash_seconds
+    stats["bytes_per_second"] = stats["bytes_read"] / hash_seconds
+
+    order = {path: i for i, path in enumerate(file_stats)}
+    for group in result:
+        group.sort(key=order.get)
+    result.sort(key=lambda group: order[group[0]])
+    return result
+
+
+def find_duplicates(directory, verify=False, threads=8, per_device=2, cache_path=None):
+    """Find and print duplicate files in the given directory."""
+    stats = {}
+    vanished = []
+    groups = duplicate_groups(directory, verify=verify, stats=stats, threads=threads,
+                              per_device=per_device, cache_path=cache_path, vanished=vanished)
+    for path, reason in vanished:
+        print(f"skipped: {reason}: {path}")
+    duplicates = [(path, group[0]) for group in groups for path in group[1:]]
 
     if duplicates:
         print("Duplicate files found:")
@@ -36,6 +336,204 @@ def find_duplicates(directory):
             print("-" * 40)
     else:
         print("No duplicate files found.")
+    print(f"Read {stats['bytes_read']} of {stats['bytes_total']} bytes across {stats['files']} files.")
+    print(f"Hashed {stats['files_hashed']} files ({stats['cache_hits']} cached) at "
+          f"{stats['files_per_second']:.1f} files/sec, {stats['bytes_per_second'] / 1e6:.1f} MB/sec.")
+    return groups
+
+def stat_groups(groups):
+    """
+    Stat every grouped file again before acting on the groups.
+
+    Files deleted, renamed or made unreadable since the scan are dropped from
+    their group, and groups left with a single file are dropped entirely.
+    Returns (groups, {path: stat_result}, [(path, reason), ...]).
+    """
+    kept, file_stats, vanished = [], {}, []
+    for group in groups:
+        present = []
+        for path in group:
+            try:
+                file_stats[path] = os.stat(path)
+            except OSError as e:
+                vanished.append((path, f"vanished since scan ({e.strerror or e})"))
+                continue
+            present.append(path)
+        if len(present) > 1:
+            kept.append(present)
+    return kept, file_stats, vanished
+
+
+def choose_keeper(group, file_stats):
+    """Return the file to keep from a duplicate group: the oldest by mtime, ties broken by walk order."""
+    return min(group, key=lambda path: file_stats[path].st_mtime_ns)
+
+
+def plan_actions(groups, action, file_stats):
+    """
+    Return the list of steps that apply action ("hardlink", "reflink" or "delete")
+    to every duplicate except the keeper of its group.
+
+    file_stats comes from stat_groups. Each step records the target's size and
+    mtime, and the keeper's size, mtime and inode, from it so that steps whose
+    files changed since then are skipped instead of clobbering or linking to
+    the wrong content.
+    """
+    steps = []
+    for group in groups:
+        keep = choose_keeper(group, file_stats)
+        keep_stat = file_stats[keep]
+        for target in group:
+            if target == keep:
+                continue
+            st = file_stats[target]
+            same_inode = (st.st_dev, st.st_ino) == (keep_stat.st_dev, keep_stat.st_ino)
+            if same_inode and action != "delete":
+                continue
+            steps.append({
+                "action": action,
+                "keep": keep,
+                "target": target,
+                "size": st.st_size,
+                "bytes": 0 if same_inode else st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "keep_size": keep_stat.st_size,
+                "keep_mtime_ns": keep_stat.st_mtime_ns,
+                "keep_ino": keep_stat.st_ino,
+            })
+    return steps
+
+
+def reflink(src, dst):
+    """Create dst as a copy-on-write clone of src. Raises OSError if the filesystem cannot do it."""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported on this platform")
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+def atomic_replace(target, make):
+    """Build a replacement next to target with make(tmp_path), then rename it over target in one step."""
+    directory, name = os.path.split(target)
+    tmp = os.path.join(directory, f".{name}.dedup-{os.getpid()}")
+    try:
+        make(tmp)
+        os.replace(tmp, target)
+    except OSError:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def apply_step(step):
+    target, keep = step["target"], step["keep"]
+    if step["action"] == "delete":
+        os.unlink(target)
+    elif step["action"] == "hardlink":
+        atomic_replace(target, lambda tmp: os.link(keep, tmp))
+    elif step["action"] == "reflink":
+        def make(tmp):
+            reflink(keep, tmp)
+            shutil.copystat(target, tmp)
+        atomic_replace(target, make)
+
+
+def execute_actions(steps, dry_run=False):
+    """Run all planned steps, recording a status on each one. Returns the number of bytes reclaimed."""
+    reclaimed = 0
+    for step in steps:
+        if dry_run:
+            step["status"] = "dry-run"
+            continue
+        try:
+            keep_st = os.stat(step["keep"])
+        except OSError as e:
+            step["status"] = f"skipped: keeper vanished since scan ({e.strerror or e})"
+            continue
+        if (keep_st.st_size, keep_st.st_mtime_ns, keep_st.st_ino) != (
+                step["keep_size"], step["keep_mtime_ns"], step["keep_ino"]):
+            step["status"] = "skipped: keeper changed since scan"
+            continue
+        try:
+            st = os.stat(step["target"])
+            if (st.st_size, st.st_mtime_ns) != (step["size"], step["mtime_ns"]):
+                step["status"] = "skipped: changed since scan"
+                continue
+            apply_step(step)
+        except OSError as e:
+            step["status"] = f"error: {e.strerror or e}"
+            continue
+        step["status"] = "done"
+        reclaimed += step["bytes"]
+    return reclaimed
+
+
+def print_groups(groups, sizes, vanished, steps, stats, reclaimed, dry_run):
+    for i, (group, size) in enumerate(zip(groups, sizes), 1):
+        print(f"Set {i}: {len(group)} files, {size} bytes each")
+        for path in group:
+            print(f"  {path}")
+    if not groups:
+        print("No duplicate files found.")
+    for path, reason in vanished:
+        print(f"skipped: {reason}: {path}")
+    for step in steps:
+        print(f"{step['status']}: {step['action']} {step['target']} -> {step['keep']}")
+    if steps:
+        total = sum(step["bytes"] for step in steps)
+        if dry_run:
+            print(f"Would reclaim {total} bytes.")
+        else:
+            print(f"Reclaimed {reclaimed} of {total} bytes.")
+    print(f"Read {stats['bytes_read']} of {stats['bytes_total']} bytes across {stats['files']} files "
+          f"in {stats['elapsed_seconds']:.2f}s.", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate files and optionally reclaim their space.")
+    parser.add_argument("directory", help="Directory to scan")
+    parser.add_argument("--json", action="store_true", help="Print groups, actions and stats as JSON")
+    parser.add_argument("--verify", action="store_true",
+                        help="Confirm duplicates byte-by-byte (always done before any action)")
+    parser.add_argument("--threads", type=int, default=8, help="Hashing threads (default: 8)")
+    parser.add_argument("--per-device", type=int, default=2,
+                        help="Maximum concurrent reads per device (default: 2)")
+    parser.add_argument("--cache", help="SQLite file to cache digests between runs")
+    actions = parser.add_mutually_exclusive_group()
+    actions.add_argument("--hardlink", dest="action", action="store_const", const="hardlink",
+                         help="Replace duplicates with hard links to the oldest copy")
+    actions.add_argument("--reflink", dest="action", action="store_const", const="reflink",
+                         help="Replace duplicates with copy-on-write clones of the oldest copy (btrfs/XFS)")
+    actions.add_argument("--delete-keep-oldest", dest="action", action="store_const", const="delete",
+                         help="Delete every duplicate except the oldest copy")
+    parser.add_argument("--dry-run", action="store_true", help="Show what the action would do without doing it")
+    args = parser.parse_args()
+
+    stats = {}
+    unreadable = []
+    groups = duplicate_groups(args.directory, verify=args.verify or args.action is not None, stats=stats,
+                              threads=args.threads, per_device=args.per_device, cache_path=args.cache,
+                              vanished=unreadable)
+    groups, file_stats, vanished = stat_groups(groups)
+    vanished = unreadable + vanished
+    sizes = [file_stats[group[0]].st_size for group in groups]
+    steps = plan_actions(groups, args.action, file_stats) if args.action else []
+    reclaimed = execute_actions(steps, dry_run=args.dry_run)
+
+    if args.json:
+        json.dump({
+            "groups": [{"size": size, "files": group} for group, size in zip(groups, sizes)],
+            "skipped": [{"path": path, "status": f"skipped: {reason}"} for path, reason in vanished],
+            "actions": steps,
+            "reclaimed_bytes": reclaimed,
+            "stats": stats,
+        }, sys.stdout, indent=2)
+        print()
+    else:
+        print_groups(groups, sizes, vanished, steps, stats, reclaimed, args.dry_run)
+    if any(step["status"].startswith("error") for step in steps):
+        sys.exit(1)
+
 
-# Example usage:
-find_duplicates("../pythongames")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
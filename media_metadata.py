@@ -1,9 +1,21 @@
+import io
 import os
+import re
 import sys
+import csv
+import json
+import math
+import inspect
 import argparse
 import sqlite3
+import hashlib
+import time
+import queue
 import datetime
+import threading
 import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 try:
     import exifread  # Images se EXIF data extract karne ke liye
@@ -17,10 +29,124 @@ except ImportError:
     print("Please install mutagen: pip install mutagen")
     sys.exit(1)
 
+try:
+    # Watch mode mein filesystem events (inotify/FSEvents) ke liye; na ho toh polling fallback
+    from watchdog.observers import Observer
+    from watchdog.observers.polling import PollingObserver
+except ImportError:
+    Observer = PollingObserver = None
+
 # Supported file extensions ki list
-SUPPORTED_EXTENSIONS = ['.jpg', '.jpeg', '.tiff', '.png',  # images
-                        '.mp4', '.mov', '.avi', '.mkv',       # videos
-                        '.mp3', '.flac', '.wav', '.aac']       # audio
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.tiff', '.png']
+VIDEO_EXTENSIONS = ['.mp4', '.mov', '.avi', '.mkv']
+AUDIO_EXTENSIONS = ['.mp3', '.flac', '.wav', '.aac']
+SUPPORTED_EXTENSIONS = IMAGE_EXTENSIONS + VIDEO_EXTENSIONS + AUDIO_EXTENSIONS
+
+# EXIF sub-IFD mein humein ExifImageLength tak ke tags chahiye, uske baad parsing rok do
+EXIF_OPTIONS = {'details': False, 'stop_tag': 'ExifImageLength'}
+if 'extract_thumbnail' in inspect.signature(exifread.process_file).parameters:
+    EXIF_OPTIONS['extract_thumbnail'] = False
+
+# Ek ffmpeg process mein kitne videos probe karne hain
+VIDEO_BATCH_SIZE = 32
+# Scan threads itni der mein ek baar stop event check karte hain (Ctrl+C par jaldi band hone ke liye)
+STOP_POLL_INTERVAL = 0.1
+FFMPEG_INPUT_RE = re.compile(r'^Input #(\d+), ', re.MULTILINE)
+FFMPEG_DURATION_RE = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+FFMPEG_VIDEO_RE = re.compile(r'Stream #\d+:\d+.*?: Video: .*?[\s,](\d{2,5})x(\d{2,5})(?=[\s,\]]|$)', re.MULTILINE)
+
+# Purane databases mein baad mein add hue columns (name, type); create_table inhe migrate karta hai
+MIGRATION_COLUMNS = [
+    ('mtime_ns', 'INTEGER'),
+    ('inode', 'INTEGER'),
+    ('content_hash', 'TEXT'),
+    ('created_epoch', 'INTEGER'),
+    ('modified_epoch', 'INTEGER'),
+    ('width', 'INTEGER'),
+    ('height', 'INTEGER'),
+    ('latitude', 'REAL'),
+    ('longitude', 'REAL'),
+]
+
+# Migration ke waqt naye columns ko purane text columns se bharne ke SQL expressions.
+# date_created/date_modified local time mein store hain, isliye 'utc' modifier se epoch banta hai.
+# Separator ('x' / ',') na ho toh CAST('') 0 de deta, isliye aise rows mein NULL rakha jaata hai.
+MIGRATION_BACKFILL = {
+    'created_epoch': "CAST(strftime('%s', date_created, 'utc') AS INTEGER)",
+    'modified_epoch': "CAST(strftime('%s', date_modified, 'utc') AS INTEGER)",
+    'width': "CASE WHEN instr(resolution, 'x') > 0 "
+             "THEN CAST(substr(resolution, 1, instr(resolution, 'x') - 1) AS INTEGER) ELSE NULL END",
+    'height': "CASE WHEN instr(resolution, 'x') > 0 "
+              "THEN CAST(substr(resolution, instr(resolution, 'x') + 1) AS INTEGER) ELSE NULL END",
+    'latitude': "CASE WHEN instr(geolocation, ',') > 0 "
+                "THEN CAST(substr(geolocation, 1, instr(geolocation, ',') - 1) AS REAL) ELSE NULL END",
+    'longitude': "CASE WHEN instr(geolocation, ',') > 0 "
+                 "THEN CAST(substr(geolocation, instr(geolocation, ',') + 1) AS REAL) ELSE NULL END",
+}
+
+# query_database ke filter combinations ke liye indexes (equality columns pehle, range column last)
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_media_created ON media_metadata (created_epoch)",
+    "CREATE INDEX IF NOT EXISTS idx_media_size ON media_metadata (file_size)",
+    "CREATE INDEX IF NOT EXISTS idx_media_format_created ON media_metadata (file_format, created_epoch)",
+    "CREATE INDEX IF NOT EXISTS idx_media_format_size ON media_metadata (file_format, file_size)",
+    "CREATE INDEX IF NOT EXISTS idx_media_dims_created ON media_metadata (width, height, created_epoch)",
+    "CREATE INDEX IF NOT EXISTS idx_media_format_dims ON media_metadata (file_format, width, height)",
+]
+
+# Geotagged rows ka R*Tree spatial index. Triggers ise media_metadata ke saath sync rakhte hain;
+# BEFORE INSERT wala trigger INSERT OR REPLACE se hatne wali purani row ki entry bhi saaf karta hai.
+GEO_INDEX_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS media_geo USING rtree(
+        id, min_lat, max_lat, min_lon, max_lon
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS media_geo_before_insert BEFORE INSERT ON media_metadata BEGIN
+        DELETE FROM media_geo WHERE id = (SELECT id FROM media_metadata WHERE file_path = NEW.file_path);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS media_geo_after_insert AFTER INSERT ON media_metadata
+    WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL BEGIN
+        INSERT OR REPLACE INTO media_geo VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS media_geo_after_update AFTER UPDATE OF latitude, longitude ON media_metadata BEGIN
+        DELETE FROM media_geo WHERE id = OLD.id;
+        INSERT INTO media_geo SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+        WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS media_geo_after_delete AFTER DELETE ON media_metadata BEGIN
+        DELETE FROM media_geo WHERE id = OLD.id;
+    END""",
+]
+
+# Jis SQLite build mein R*Tree module nahi hai wahaan plain (latitude, longitude) index use hota hai
+GEO_FALLBACK_INDEX = "CREATE INDEX IF NOT EXISTS idx_media_latlon ON media_metadata (latitude, longitude)"
+
+EARTH_RADIUS_KM = 6371.0088
+# Box ke edges par float rounding se points na chhootein, isliye thoda (~1 cm) extra margin
+GEO_BOX_PADDING_DEG = 1e-7
+
+# Har row ke saath likhe jaane wale columns, insert_metadata isi order mein values bind karta hai
+METADATA_COLUMNS = ['file_path', 'file_format', 'resolution', 'duration', 'geolocation',
+                    'file_size', 'date_created', 'date_modified'] + [name for name, _ in MIGRATION_COLUMNS]
+
+INSERT_SQL = f"""
+    INSERT OR REPLACE INTO media_metadata
+    ({', '.join(METADATA_COLUMNS)})
+    VALUES ({', '.join('?' for _ in METADATA_COLUMNS)})
+"""
+
+def configure_connection(conn):
+    """
+    Bulk ingest ke liye SQLite pragmas set karta hai:
+    WAL journaling (readers writer ko block nahi karte), synchronous=NORMAL (WAL mein crash-safe,
+    sirf checkpoint par fsync), bada page cache aur temp tables memory mein.
+    """
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")  # ~64 MB
+        conn.execute("PRAGMA temp_store=MEMORY")
+    except Exception as e:
+        print(f"Error configuring database: {e}", file=sys.stderr)
 
 def create_table(conn):
     """Agar pehle se table na ho toh SQLite database mein media_metadata table create karta hai."""
@@ -39,10 +165,115 @@ def create_table(conn):
     """
     try:
         conn.execute(create_table_sql)
+        # Purane schema wale database mein naye columns add karo
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(media_metadata)")}
+        for name, column_type in MIGRATION_COLUMNS:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE media_metadata ADD COLUMN {name} {column_type}")
+                if name in MIGRATION_BACKFILL:
+                    conn.execute(f"UPDATE media_metadata SET {name} = {MIGRATION_BACKFILL[name]}")
+        for index_sql in INDEXES:
+            conn.execute(index_sql)
+        create_geo_index(conn)
         conn.commit()
     except Exception as e:
         print(f"Error creating table: {e}", file=sys.stderr)
 
+def has_geo_index(conn):
+    """Batata hai ki database mein media_geo R*Tree table hai ya nahi."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'media_geo'"
+    ).fetchone() is not None
+
+def create_geo_index(conn):
+    """
+    media_geo R*Tree aur uske sync triggers create karta hai; pehli baar banne par existing
+    geotagged rows se bhar deta hai. R*Tree na mile toh (latitude, longitude) index bana deta hai.
+    """
+    existed = has_geo_index(conn)
+    try:
+        for sql in GEO_INDEX_SQL:
+            conn.execute(sql)
+    except sqlite3.OperationalError as e:
+        print(f"R*Tree not available, using a plain lat/lon index: {e}", file=sys.stderr)
+        conn.execute(GEO_FALLBACK_INDEX)
+        return
+    if not existed:
+        conn.execute("""
+            INSERT INTO media_geo
+            SELECT id, latitude, latitude, longitude, longitude FROM media_metadata
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        """)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Do (lat, lon) points ke beech great-circle distance kilometers mein."""
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def radius_bbox(lat, lon, radius_km):
+    """
+    (lat, lon) ke around radius_km circle ko ghere hue bounding box (min_lat, min_lon, max_lat, max_lon).
+    Degrees wahi EARTH_RADIUS_KM se nikalte hain jo haversine_km use karta hai, isliye box circle se
+    chhota nahi hota. Longitudes ±180 ke bahar ja sakti hain; split_antimeridian unhe todta hai.
+    Circle mein pole aa jaaye toh poori longitude range le leta hai.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angle) + GEO_BOX_PADDING_DEG
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, -180.0, max_lat, 180.0
+    # Spherical cap ki exact longitude extent: asin(sin(angle) / cos(lat))
+    ratio = math.sin(min(angle, math.pi / 2)) / math.cos(math.radians(lat))
+    if ratio >= 1.0:
+        return min_lat, -180.0, max_lat, 180.0
+    dlon = math.degrees(math.asin(ratio)) + GEO_BOX_PADDING_DEG
+    return min_lat, lon - dlon, max_lat, lon + dlon
+
+def split_antimeridian(min_lat, min_lon, max_lat, max_lon):
+    """
+    Box ko [-180, 180] longitude range ke andar ek ya do boxes mein todta hai. ±180 ke paar
+    jaane wale box (ya min_lon > max_lon wala user bbox) dono taraf ke hisson mein bant jaate hain.
+    """
+    if max_lon - min_lon >= 360.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    if min_lon < -180.0:
+        return [(min_lat, min_lon + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360.0)]
+    if min_lon > max_lon:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+def geo_box_filter(boxes, geo_index):
+    """
+    Boxes mein se kisi ek ke andar wali rows ka SQL condition aur params.
+    R*Tree par overlap predicates lagte hain: media_geo float32 mein store hota hai (min neeche, max
+    upar round hote hain), isliye containment edge wale points chhod deta, overlap nahi.
+    R*Tree na ho toh exact latitude/longitude range check hota hai.
+    """
+    params = []
+    if geo_index:
+        selects = []
+        for min_lat, min_lon, max_lat, max_lon in boxes:
+            selects.append("SELECT id FROM media_geo WHERE max_lat >= ? AND min_lat <= ?"
+                           " AND max_lon >= ? AND min_lon <= ?")
+            params.extend([min_lat, max_lat, min_lon, max_lon])
+        return f"id IN ({' UNION ALL '.join(selects)})", params
+    clauses = []
+    for min_lat, min_lon, max_lat, max_lon in boxes:
+        clauses.append("(latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?)")
+        params.extend([min_lat, max_lat, min_lon, max_lon])
+    return f"({' OR '.join(clauses)})", params
+
+def register_functions(conn):
+    """Queries mein use hone wale Python SQL functions register karta hai."""
+    conn.create_function("haversine_km", 4, haversine_km, deterministic=True)
+
 def convert_to_degrees(value):
     """
     EXIF GPS coordinates ko decimal degrees mein convert karta hai.
@@ -57,22 +288,62 @@ def convert_to_degrees(value):
         print(f"Error converting GPS coordinates: {e}", file=sys.stderr)
         return None
 
+def jpeg_exif_segment(f):
+    """
+    JPEG ke markers walk karke sirf EXIF APP1 segment padhta hai (baaki segments seek se skip).
+    SOI + APP1 bytes return karta hai jo exifread memory mein parse kar sake, EXIF na mile toh None.
+    """
+    if f.read(2) != b'\xff\xd8':
+        return None
+    while True:
+        marker = f.read(4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD9, 0xDA):  # EOI / start of scan: iske baad sirf image data hai
+            return None
+        length = int.from_bytes(marker[2:4], 'big')
+        if marker[1] == 0xE1:
+            payload = f.read(length - 2)
+            if payload.startswith(b'Exif\x00\x00'):
+                return b'\xff\xd8' + marker + payload
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+def read_exif_tags(file_path):
+    """
+    File ke EXIF tags padhta hai. JPEG ke liye sirf EXIF APP1 segment (max 64 KB) bounded reads mein
+    memory mein aata hai aur wahin parse hota hai; agar segment nahi mila toh poori file se parse karta hai.
+    Makernotes aur thumbnails skip hote hain aur stop_tag ke baad parsing ruk jaati hai.
+    """
+    with open(file_path, 'rb') as f:
+        if os.path.splitext(file_path)[1].lower() in ('.jpg', '.jpeg'):
+            segment = jpeg_exif_segment(f)
+            if segment is not None:
+                return exifread.process_file(io.BytesIO(segment), **EXIF_OPTIONS)
+        return exifread.process_file(f, **EXIF_OPTIONS)
+
 def extract_image_metadata(file_path, metadata):
     """Exifread ka use karke image files se metadata extract karta hai."""
     try:
-        with open(file_path, 'rb') as f:
-            tags = exifread.process_file(f, details=False)
-            # Agar available ho toh resolution extract karo
-            if 'EXIF ExifImageWidth' in tags and 'EXIF ExifImageLength' in tags:
-                width = str(tags['EXIF ExifImageWidth'])
-                height = str(tags['EXIF ExifImageLength'])
-                metadata['resolution'] = f"{width}x{height}"
-            # Agar available ho toh geolocation extract karo
-            if 'GPS GPSLatitude' in tags and 'GPS GPSLongitude' in tags:
-                lat = convert_to_degrees(tags['GPS GPSLatitude'])
-                lon = convert_to_degrees(tags['GPS GPSLongitude'])
-                if lat is not None and lon is not None:
-                    metadata['geolocation'] = f"{lat},{lon}"
+        tags = read_exif_tags(file_path)
+        # Agar available ho toh resolution extract karo
+        if 'EXIF ExifImageWidth' in tags and 'EXIF ExifImageLength' in tags:
+            width = str(tags['EXIF ExifImageWidth'])
+            height = str(tags['EXIF ExifImageLength'])
+            metadata['resolution'] = f"{width}x{height}"
+        # Agar available ho toh geolocation extract karo
+        if 'GPS GPSLatitude' in tags and 'GPS GPSLongitude' in tags:
+            lat = convert_to_degrees(tags['GPS GPSLatitude'])
+            lon = convert_to_degrees(tags['GPS GPSLongitude'])
+            if lat is not None and lon is not None:
+                # Southern/western hemisphere ke coordinates negative hote hain
+                if str(tags.get('GPS GPSLatitudeRef', 'N')).strip().upper() == 'S':
+                    lat = -lat
+                if str(tags.get('GPS GPSLongitudeRef', 'E')).strip().upper() == 'W':
+                    lon = -lon
+                metadata['geolocation'] = f"{lat},{lon}"
+                metadata['latitude'] = lat
+                metadata['longitude'] = lon
     except Exception as e:
         print(f"Error extracting image metadata for {file_path}: {e}", file=sys.stderr)
     return metadata
@@ -98,6 +369,70 @@ def extract_video_metadata(file_path, metadata):
         print(f"Error extracting video metadata for {file_path}: {e}", file=sys.stderr)
     return metadata
 
+def probe_videos(file_paths):
+    """
+    Ek hi `ffmpeg` process mein saare given videos open karke unka (width, height, duration) nikalta hai.
+    ffmpeg har input ki info open karte hi stderr par dump karta hai aur pehli kharab file par ruk jaata hai,
+    isliye ye sirf shuru ke successfully open hue inputs ki list return karta hai (same order mein).
+    """
+    command = ['ffmpeg', '-hide_banner', '-nostdin']
+    for file_path in file_paths:
+        command += ['-i', 'file:' + file_path]  # 'file:' prefix taaki path protocol/option na samjha jaaye
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            text=True, errors='replace')
+
+    sections = FFMPEG_INPUT_RE.split(result.stderr)[1:]  # [index, text, index, text, ...]
+    probes = []
+    for index, text in zip(sections[0::2], sections[1::2]):
+        if int(index) != len(probes):
+            break
+        width = height = duration = None
+        video = FFMPEG_VIDEO_RE.search(text)
+        if video:
+            width, height = video.group(1), video.group(2)
+        match = FFMPEG_DURATION_RE.search(text)
+        if match:
+            hours, minutes, seconds = match.groups()
+            duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        probes.append((width, height, duration))
+    return probes
+
+def extract_videos_metadata(file_paths, batch_size=VIDEO_BATCH_SIZE):
+    """
+    Kai video files ka metadata batches mein nikalta hai: har batch ke liye ek ffmpeg process,
+    per-file ffprobe process ke bajaye. Jis file par ffmpeg ruk jaaye (ya ffmpeg na mile) uske liye
+    per-file `extract_video_metadata` fallback hota hai aur baaki files agle batch mein jaati hain.
+    Metadata dictionaries input order mein return hoti hain.
+    """
+    probes = {}
+    remaining = list(file_paths)
+    while remaining:
+        chunk, remaining = remaining[:batch_size], remaining[batch_size:]
+        try:
+            probed = probe_videos(chunk)
+        except Exception as e:
+            print(f"Error running batched ffmpeg probe: {e}", file=sys.stderr)
+            break  # Baaki sab files per-file fallback se process hongi
+        probes.update(zip(chunk, probed))
+        if len(probed) < len(chunk):
+            # chunk[len(probed)] par ffmpeg fail hua; uske baad wali files dobara batch mein
+            remaining = chunk[len(probed) + 1:] + remaining
+
+    results = []
+    for file_path in file_paths:
+        metadata = base_metadata(file_path)
+        probe = probes.get(file_path)
+        if probe is None:
+            metadata = extract_video_metadata(file_path, metadata)
+        else:
+            width, height, duration = probe
+            if width is not None:
+                metadata['resolution'] = f"{width}x{height}"
+            metadata['duration'] = duration
+        metadata['width'], metadata['height'] = parse_resolution(metadata['resolution'])
+        results.append(metadata)
+    return results
+
 def extract_audio_metadata(file_path, metadata):
     """Mutagen ka upyog karke audio files se metadata extract karta hai."""
     try:
@@ -110,11 +445,16 @@ def extract_audio_metadata(file_path, metadata):
         print(f"Error extracting audio metadata for {file_path}: {e}", file=sys.stderr)
     return metadata
 
-def extract_metadata(file_path):
-    """
-    Diye gaye file se metadata extract karta hai.
-    Ek dictionary return karta hai jisme file path, format, resolution, duration, geolocation, file size, aur timestamps shamil hain.
-    """
+def parse_resolution(resolution):
+    """"WxH" string ko (width, height) integers mein badalta hai, galat format par (None, None)."""
+    try:
+        width, height = resolution.lower().split('x')
+        return int(width), int(height)
+    except (AttributeError, ValueError):
+        return None, None
+
+def base_metadata(file_path):
+    """File path, format aur stat se milne wale fields (size, timestamps, inode) ke saath metadata dictionary banata hai."""
     metadata = {
         'file_path': file_path,
         'file_format': os.path.splitext(file_path)[1].lower(),
@@ -123,81 +463,746 @@ def extract_metadata(file_path):
         'geolocation': None,
         'file_size': None,
         'date_created': None,
-        'date_modified': None
+        'date_modified': None,
+        'mtime_ns': None,
+        'inode': None,
+        'content_hash': None,
+        'created_epoch': None,
+        'modified_epoch': None,
+        'width': None,
+        'height': None,
+        'latitude': None,
+        'longitude': None
     }
     # File size aur timestamps retrieve karo
     try:
         stat = os.stat(file_path)
         metadata['file_size'] = stat.st_size
+        metadata['mtime_ns'] = stat.st_mtime_ns
+        metadata['inode'] = stat.st_ino
+        metadata['created_epoch'] = int(stat.st_ctime)
+        metadata['modified_epoch'] = int(stat.st_mtime)
         metadata['date_created'] = datetime.datetime.fromtimestamp(stat.st_ctime).strftime("%Y-%m-%d %H:%M:%S")
         metadata['date_modified'] = datetime.datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
     except Exception as e:
         print(f"Error accessing file stats for {file_path}: {e}", file=sys.stderr)
+    return metadata
 
+def extract_metadata(file_path):
+    """
+    Diye gaye file se metadata extract karta hai.
+    Ek dictionary return karta hai jisme file path, format, resolution, duration, geolocation, file size, aur timestamps shamil hain.
+    """
+    metadata = base_metadata(file_path)
     ext = metadata['file_format']
-    if ext in ['.jpg', '.jpeg', '.tiff', '.png']:
+    if ext in IMAGE_EXTENSIONS:
         metadata = extract_image_metadata(file_path, metadata)
-    elif ext in ['.mp4', '.mov', '.avi', '.mkv']:
+    elif ext in VIDEO_EXTENSIONS:
         metadata = extract_video_metadata(file_path, metadata)
-    elif ext in ['.mp3', '.flac', '.wav', '.aac']:
+    elif ext in AUDIO_EXTENSIONS:
         metadata = extract_audio_metadata(file_path, metadata)
     else:
         print(f"Unsupported file type for file: {file_path}", file=sys.stderr)
 
+    metadata['width'], metadata['height'] = parse_resolution(metadata['resolution'])
     return metadata
 
+def metadata_row(metadata):
+    """Metadata dictionary ko INSERT_SQL ke column order wale tuple mein badalta hai."""
+    return tuple(metadata.get(column) for column in METADATA_COLUMNS)
+
 def insert_metadata(conn, metadata):
-    """SQLite database mein metadata insert ya update karta hai."""
+    """SQLite database mein metadata insert ya update karta hai. Row likhi gayi toh True return karta hai."""
     try:
-        conn.execute("""
-            INSERT OR REPLACE INTO media_metadata
-            (file_path, file_format, resolution, duration, geolocation, file_size, date_created, date_modified)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            metadata['file_path'],
-            metadata['file_format'],
-            metadata['resolution'],
-            metadata['duration'],
-            metadata['geolocation'],
-            metadata['file_size'],
-            metadata['date_created'],
-            metadata['date_modified']
-        ))
+        conn.execute(INSERT_SQL, metadata_row(metadata))
         conn.commit()
+        return True
     except Exception as e:
         print(f"Error inserting metadata for {metadata['file_path']}: {e}", file=sys.stderr)
+        return False
+
+class MetadataWriter:
+    """
+    Buffered writer jo rows ko `executemany` batches mein ek explicit transaction ke andar likhta hai.
+    Har `batch_size` rows ya `flush_interval` seconds (jo pehle ho) par commit hota hai.
+    Har batch atomic hai: crash hone par ya toh poora batch database mein hoga ya bilkul nahi.
+    """
+
+    def __init__(self, conn, batch_size=1000, flush_interval=2.0):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.rows_written = 0
+
+    def add(self, metadata):
+        self.buffer.append(metadata)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """Agar pichle commit ko `flush_interval` se zyada time ho gaya hai toh buffer flush karta hai."""
+        if self.buffer and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        batch, self.buffer = self.buffer, []
+        self.last_flush = time.monotonic()
+        if not batch:
+            return
+        try:
+            with self.conn:  # BEGIN ... COMMIT, error par ROLLBACK
+                self.conn.executemany(INSERT_SQL, [metadata_row(m) for m in batch])
+            self.rows_written += len(batch)
+        except Exception as e:
+            # Batch fail hua toh row-by-row likho taaki sirf kharab row skip ho
+            print(f"Error writing batch of {len(batch)} rows, retrying row by row: {e}", file=sys.stderr)
+            for metadata in batch:
+                if insert_metadata(self.conn, metadata):
+                    self.rows_written += 1
+
+    def close(self):
+        self.flush()
+
+def synthetic_metadata(i):
+    """Benchmark ke liye ek fake metadata row banata hai."""
+    ext = SUPPORTED_EXTENSIONS[i % len(SUPPORTED_EXTENSIONS)]
+    return {
+        'file_path': f"/synthetic/library/{i // 1000:04d}/file_{i:08d}{ext}",
+        'file_format': ext,
+        'resolution': "1920x1080" if ext not in AUDIO_EXTENSIONS else None,
+        'duration': float(i % 600) if ext not in IMAGE_EXTENSIONS else None,
+        'geolocation': None,
+        'file_size': 1000 + i,
+        'date_created': "2024-01-01 00:00:00",
+        'date_modified': "2024-01-01 00:00:00",
+        'mtime_ns': 1704067200 * 10**9 + i,
+        'inode': i,
+        'created_epoch': 1704067200 + i * 60,
+        'modified_epoch': 1704067200 + i * 60,
+        'width': 1920 if ext not in AUDIO_EXTENSIONS else None,
+        'height': 1080 if ext not in AUDIO_EXTENSIONS else None,
+        'latitude': None,
+        'longitude': None,
+    }
+
+def synthetic_exif_jpeg(width, height, lat, lon, padding=256 * 1024):
+    """
+    Benchmark ke liye JPEG jaisi bytes banata hai: SOI + EXIF APP1 (image size aur GPS ke saath)
+    + `padding` bytes fake image data + EOI. exifread ke liye ye ek valid EXIF JPEG hai.
+    """
+    import struct
+
+    def rationals(value):
+        degrees = int(value)
+        minutes = int((value - degrees) * 60)
+        seconds = round(((value - degrees) * 60 - minutes) * 60 * 100)
+        return struct.pack('>6I', degrees, 1, minutes, 1, seconds, 100)
+
+    # TIFF layout (big-endian): header | IFD0 @8 | EXIF IFD @38 | GPS IFD @68 | GPS rationals @122
+    tiff = b'MM' + struct.pack('>HI', 42, 8)
+    tiff += struct.pack('>H', 2)
+    tiff += struct.pack('>HHII', 0x8769, 4, 1, 38)  # ExifOffset
+    tiff += struct.pack('>HHII', 0x8825, 4, 1, 68)  # GPSInfo
+    tiff += struct.pack('>I', 0)
+    tiff += struct.pack('>H', 2)
+    tiff += struct.pack('>HHII', 0xA002, 4, 1, width)  # ExifImageWidth
+    tiff += struct.pack('>HHII', 0xA003, 4, 1, height)  # ExifImageLength
+    tiff += struct.pack('>I', 0)
+    tiff += struct.pack('>H', 4)
+    tiff += struct.pack('>HHI4s', 1, 2, 2, b'N' if lat >= 0 else b'S')
+    tiff += struct.pack('>HHII', 2, 5, 3, 122)
+    tiff += struct.pack('>HHI4s', 3, 2, 2, b'E' if lon >= 0 else b'W')
+    tiff += struct.pack('>HHII', 4, 5, 3, 146)
+    tiff += struct.pack('>I', 0)
+    tiff += rationals(abs(lat)) + rationals(abs(lon))
+
+    app1 = b'Exif\x00\x00' + tiff
+    return (b'\xff\xd8' + b'\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1
+            + b'\xff\xda' + os.urandom(padding) + b'\xff\xd9')
+
+def benchmark_extract(images=2000, videos=50, directory=None):
+    """
+    Locally generate kiye synthetic corpus par extraction files/sec measure karta hai:
+    images ke liye full-file exifread parse vs bounded EXIF segment read, aur videos ke liye
+    per-file probe process vs batched ffmpeg probe (ffmpeg installed ho tabhi).
+    """
+    import random
+    import shutil
+    import tempfile
+    random.seed(42)
+    results = {}
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        image_paths = []
+        for i in range(images):
+            path = os.path.join(tmp, f"img_{i:06d}.jpg")
+            with open(path, 'wb') as f:
+                f.write(synthetic_exif_jpeg(4000, 3000, random.uniform(-80, 80), random.uniform(-180, 180)))
+            image_paths.append(path)
+
+        start = time.perf_counter()
+        for path in image_paths:
+            with open(path, 'rb') as f:
+                exifread.process_file(f, details=False)
+        results['images_full_parse'] = images / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for path in image_paths:
+            read_exif_tags(path)
+        results['images_bounded_header'] = images / (time.perf_counter() - start)
+        print(f"Images, full exifread parse:   {results['images_full_parse']:.0f} files/sec")
+        print(f"Images, bounded EXIF segment:  {results['images_bounded_header']:.0f} files/sec")
+
+        if videos and shutil.which('ffmpeg'):
+            video_paths = []
+            for i in range(videos):
+                path = os.path.join(tmp, f"clip_{i:04d}.mp4")
+                subprocess.run(['ffmpeg', '-loglevel', 'error', '-nostdin', '-y', '-f', 'lavfi',
+                                '-i', 'testsrc=duration=1:size=320x240:rate=10', path], check=True)
+                video_paths.append(path)
+            start = time.perf_counter()
+            for path in video_paths:
+                probe_videos([path])
+            results['videos_per_file'] = videos / (time.perf_counter() - start)
+            start = time.perf_counter()
+            extract_videos_metadata(video_paths)
+            results['videos_batched'] = videos / (time.perf_counter() - start)
+            print(f"Videos, one process per file:  {results['videos_per_file']:.0f} files/sec")
+            print(f"Videos, batched ffmpeg probe:  {results['videos_batched']:.0f} files/sec")
+        elif videos:
+            print("ffmpeg not found, skipping video benchmark")
+    return results
+
+def benchmark_writer(rows=100000, batch_size=1000, baseline_rows=2000, directory=None):
+    """
+    Synthetic records ke saath per-row commit (insert_metadata) aur batched WAL writer
+    ka rows/sec compare karta hai. Baseline kam rows par chalta hai kyunki wo bahut slow hai.
+    """
+    import tempfile
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        results = {}
+
+        conn = sqlite3.connect(os.path.join(tmp, "baseline.db"))
+        create_table(conn)
+        start = time.perf_counter()
+        for i in range(baseline_rows):
+            insert_metadata(conn, synthetic_metadata(i))
+        results['per_row_commit'] = baseline_rows / (time.perf_counter() - start)
+        conn.close()
+
+        conn = sqlite3.connect(os.path.join(tmp, "batched.db"))
+        configure_connection(conn)
+        create_table(conn)
+        writer = MetadataWriter(conn, batch_size=batch_size)
+        start = time.perf_counter()
+        for i in range(rows):
+            writer.add(synthetic_metadata(i))
+        writer.close()
+        results['batched_wal'] = rows / (time.perf_counter() - start)
+        conn.close()
+
+    print(f"Per-row commit: {results['per_row_commit']:.0f} rows/sec ({baseline_rows} rows)")
+    print(f"Batched + WAL:  {results['batched_wal']:.0f} rows/sec ({rows} rows, batch_size={batch_size})")
+    return results
+
+def file_content_hash(file_path, chunk_size=1 << 20):
+    """File content ka BLAKE2b hex digest (bade chunks mein padh kar) return karta hai."""
+    digest = hashlib.blake2b()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def database_path(conn):
+    """Connection ki main database file ka path return karta hai, in-memory database ke liye None."""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == 'main':
+            return path or None
+    return None
 
-def scan_directory(directory, conn):
+def stored_signature(reader, file_path):
+    """
+    Database mein stored (file_size, mtime_ns, inode, content_hash) return karta hai.
+    file_path par UNIQUE index hai, isliye ye ek single indexed lookup hai.
+    """
+    return reader.execute(
+        "SELECT file_size, mtime_ns, inode, content_hash FROM media_metadata WHERE file_path = ?",
+        (file_path,)
+    ).fetchone()
+
+def path_prefix_range(directory):
+    """Directory ke andar ke saare file_path values ke liye index-friendly [low, high) range."""
+    prefix = os.path.join(directory, '')
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def purge_deleted(conn, directory):
+    """
+    Directory ke andar ki un rows ko delete karta hai jinki file ab disk par nahi hai.
+    Deleted rows ka count return karta hai.
+    """
+    low, high = path_prefix_range(directory)
+    rows = conn.execute(
+        "SELECT file_path FROM media_metadata WHERE file_path >= ? AND file_path < ?", (low, high)
+    ).fetchall()
+    deleted = [(path,) for (path,) in rows if not os.path.exists(path)]
+    if deleted:
+        conn.executemany("DELETE FROM media_metadata WHERE file_path = ?", deleted)
+        conn.commit()
+    return len(deleted)
+
+def iter_media_files(directory):
+    """
+    Directory ko recursively walk karke supported multimedia files ke paths yield karta hai.
+    Directories aur files sorted order me walk hoti hain taaki har scan ka order same rahe.
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file in sorted(files):
+            if os.path.splitext(file)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.join(root, file)
+
+class ScanProgress:
+    """Scan ke dauraan stderr par processed files aur throughput (files/sec) ka readout deta hai."""
+
+    def __init__(self, interval=1.0, stream=sys.stderr):
+        self.interval = interval
+        self.stream = stream
+        self.start = time.monotonic()
+        self.last_report = self.start
+        self.processed = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def update(self, ok=True, skipped=False):
+        self.processed += 1
+        if not ok:
+            self.errors += 1
+        if skipped:
+            self.skipped += 1
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(now)
+
+    def report(self, now=None):
+        elapsed = (now or time.monotonic()) - self.start
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        print(f"Processed {self.processed} files ({self.skipped} unchanged, {self.errors} errors) "
+              f"in {elapsed:.1f}s - {rate:.1f} files/sec", file=self.stream)
+
+def scan_directory(directory, conn, workers=8, exif_processes=None, max_pending=1000,
+                   incremental=True, verify_hash=False, purge=True, batch_size=1000, flush_interval=2.0,
+                   video_batch_size=VIDEO_BATCH_SIZE, mp_context=None):
     """
     Specified directory ko recursively scan karta hai supported multimedia files ke liye,
     metadata extract karta hai, aur results ko database mein store karta hai.
+
+    Pipeline:
+    - ek walker thread paths ko bounded queue mein daalta hai,
+    - `workers` threads IO-bound extraction (mutagen, hashing) karte hain,
+    - videos alag queue se `workers // 2` batcher threads ke paas jaate hain jo `video_batch_size`
+      files ek hi ffmpeg process se probe karte hain (1 = purana per-file ffprobe path),
+    - CPU-heavy EXIF parsing `exif_processes` size ke process pool mein hoti hai
+      (None = CPU count, 0 = images bhi threads mein). `mp_context` pool ka multiprocessing context hai;
+      caller ke apne threads chal rahe hon (jaise watch mode) toh fork ki jagah "spawn" dena chahiye,
+    - calling thread akela SQLite writer hai aur rows walk order mein hi likhta hai,
+      isliye results (aur row ids) har run mein deterministic rehte hain. Rows MetadataWriter ke
+      through `batch_size` rows / `flush_interval` seconds ke transactions mein commit hoti hain.
+    `max_pending` queued + in-flight + reorder hone wali files ki upper limit hai, taaki memory bounded rahe.
+
+    `incremental` mode mein walker har file ka (file_size, mtime_ns, inode) stored values se
+    ek indexed lookup mein compare karta hai aur unchanged files ko extract kiye bina skip kar deta hai.
+    `verify_hash` ke saath unchanged dikhne wali files ka content hash bhi match kiya jaata hai.
+    `purge` scan ke baad directory ki un rows ko hata deta hai jinki files delete ho chuki hain.
     """
-    for root, _, files in os.walk(directory):
-        for file in files:
-            file_path = os.path.join(root, file)
-            ext = os.path.splitext(file)[1].lower()
-            if ext in SUPPORTED_EXTENSIONS:
-                print(f"Processing file: {file_path}")
-                try:
+    workers = max(1, workers)
+    video_batchers = max(1, workers // 2) if video_batch_size > 1 else 0
+    path_queue = queue.Queue(maxsize=max_pending)
+    video_queue = queue.Queue(maxsize=max_pending)
+    result_queue = queue.Queue()
+    slots = threading.BoundedSemaphore(max_pending)
+    stop = threading.Event()  # Writer interrupt ho jaaye toh saare threads ko rok deta hai
+    unchanged = object()  # Result marker: file skip hui, kuch likhna nahi hai
+    db_path = database_path(conn) if incremental else None
+    exif_pool = None
+    if exif_processes != 0:
+        exif_pool = ProcessPoolExecutor(max_workers=exif_processes, mp_context=mp_context)
+        # Worker processes ko threads start hone se pehle hi fork karwa do;
+        # threads chalte hue fork karne se child mein locks stuck reh sakte hain
+        exif_pool.submit(os.getpid).result()
+
+    def queue_get(q):
+        """Stop hone tak q se agla item laata hai; stop par None (sentinel jaisa) return karta hai."""
+        while not stop.is_set():
+            try:
+                return q.get(timeout=STOP_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return None
+
+    def queue_put(q, item):
+        """Bounded queue mein item daalta hai; stop ho jaaye toh False return karta hai."""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=STOP_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def walker():
+        # Walker ka apna read connection hai, writer wala connection sirf calling thread use karta hai
+        reader = sqlite3.connect(db_path, timeout=30) if db_path else None
+        try:
+            for seq, file_path in enumerate(iter_media_files(directory)):
+                # Writer ke peeche bahut aage na nikal jaaye, par stop hone par wait chhod do
+                while not slots.acquire(timeout=STOP_POLL_INTERVAL):
+                    if stop.is_set():
+                        return
+                expected_hash = None
+                if reader is not None:
+                    try:
+                        stat = os.stat(file_path)
+                        signature = stored_signature(reader, file_path)
+                    except Exception as e:
+                        print(f"Error checking file {file_path}: {e}", file=sys.stderr)
+                        signature = None
+                    if signature is not None and tuple(signature[:3]) == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+                        if not verify_hash:
+                            result_queue.put((seq, unchanged))
+                            continue
+                        expected_hash = signature[3]
+                if video_batchers and os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS:
+                    target = video_queue
+                else:
+                    target = path_queue
+                if not queue_put(target, (seq, file_path, expected_hash)):
+                    return
+        except Exception as e:
+            print(f"Error walking directory {directory}: {e}", file=sys.stderr)
+        finally:
+            if reader is not None:
+                reader.close()
+            for _ in range(workers):
+                queue_put(path_queue, None)
+            for _ in range(video_batchers):
+                queue_put(video_queue, None)
+
+    def hash_check(file_path, expected_hash):
+        """(content_hash, unchanged) return karta hai; verify_hash off ho toh hash None rehta hai."""
+        content_hash = file_content_hash(file_path) if verify_hash else None
+        return content_hash, expected_hash is not None and content_hash == expected_hash
+
+    def extractor():
+        while True:
+            item = queue_get(path_queue)
+            if item is None:
+                result_queue.put(None)
+                return
+            seq, file_path, expected_hash = item
+            try:
+                content_hash, is_unchanged = hash_check(file_path, expected_hash)
+                if is_unchanged:
+                    result_queue.put((seq, unchanged))
+                    continue
+                ext = os.path.splitext(file_path)[1].lower()
+                if exif_pool is not None and ext in IMAGE_EXTENSIONS:
+                    metadata = exif_pool.submit(extract_metadata, file_path).result()
+                else:
                     metadata = extract_metadata(file_path)
-                    insert_metadata(conn, metadata)
+                metadata['content_hash'] = content_hash
+            except Exception as e:
+                print(f"Error processing file {file_path}: {e}", file=sys.stderr)
+                metadata = None
+            result_queue.put((seq, metadata))
+
+    def video_batcher():
+        done = False
+        while not done:
+            item = queue_get(video_queue)
+            if item is None:
+                break
+            batch = [item]
+            # Jo videos turant available hain unhe bhi isi ffmpeg batch mein le lo
+            while len(batch) < video_batch_size:
+                try:
+                    item = video_queue.get(timeout=0.05)
+                except queue.Empty:
+                    break
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+
+            to_probe = []
+            for seq, file_path, expected_hash in batch:
+                try:
+                    content_hash, is_unchanged = hash_check(file_path, expected_hash)
                 except Exception as e:
                     print(f"Error processing file {file_path}: {e}", file=sys.stderr)
-            else:
-                # Unsupported file types ko skip karo
+                    result_queue.put((seq, None))
+                    continue
+                if is_unchanged:
+                    result_queue.put((seq, unchanged))
+                else:
+                    to_probe.append((seq, file_path, content_hash))
+            try:
+                results = extract_videos_metadata([file_path for _, file_path, _ in to_probe], video_batch_size)
+            except Exception as e:
+                print(f"Error processing video batch: {e}", file=sys.stderr)
+                results = [None] * len(to_probe)
+            for (seq, _, content_hash), metadata in zip(to_probe, results):
+                if metadata is not None:
+                    metadata['content_hash'] = content_hash
+                result_queue.put((seq, metadata))
+        result_queue.put(None)
+
+    threads = [threading.Thread(target=walker, daemon=True)]
+    threads += [threading.Thread(target=extractor, daemon=True) for _ in range(workers)]
+    threads += [threading.Thread(target=video_batcher, daemon=True) for _ in range(video_batchers)]
+    for t in threads:
+        t.start()
+
+    # Single writer: out-of-order results ko seq ke hisaab se reorder karke likho
+    progress = ScanProgress()
+    writer = MetadataWriter(conn, batch_size=batch_size, flush_interval=flush_interval)
+    pending = {}
+    next_seq = 0
+    finished = 0
+    completed = False
+    try:
+        while finished < workers + video_batchers:
+            try:
+                item = result_queue.get(timeout=flush_interval)
+            except queue.Empty:
+                # Slow extraction ke waqt bhi buffered rows time par commit ho jaayein
+                writer.flush_if_due()
+                continue
+            if item is None:
+                finished += 1
                 continue
+            pending[item[0]] = item[1]
+            while next_seq in pending:
+                metadata = pending.pop(next_seq)
+                if metadata is unchanged:
+                    progress.update(skipped=True)
+                else:
+                    if metadata is not None:
+                        writer.add(metadata)
+                    progress.update(ok=metadata is not None)
+                next_seq += 1
+                slots.release()
+        completed = True
+    finally:
+        if not completed:
+            # Ctrl+C ya writer error: blocked threads ko chhudao aur queued EXIF jobs cancel karo
+            stop.set()
+            if exif_pool is not None:
+                exif_pool.shutdown(wait=False, cancel_futures=True)
+        writer.close()
+        for t in threads:
+            t.join()
+        if exif_pool is not None and completed:
+            exif_pool.shutdown()
+    progress.report()
 
-def query_database(conn, filters):
+    if purge:
+        deleted = purge_deleted(conn, directory)
+        print(f"Purged {deleted} deleted files from the database", file=sys.stderr)
+
+class ChangeCollector:
     """
-    Provided filters ke basis par database ko query karta hai.
-    Filters mein date range (date_created), file type, location, resolution, aur file size shamil ho sakte hain.
+    Filesystem events se aaye changed paths ko debounce aur coalesce karta hai.
+    Ek path par kitne bhi events aayein, wo ek hi baar process hota hai; batch tab release hota hai jab
+    `debounce` seconds tak koi naya event na aaye, ya sabse purana pending event `max_delay` se purana ho jaaye.
     """
-    query = "SELECT * FROM media_metadata WHERE 1=1"
+
+    def __init__(self, debounce=2.0, max_delay=30.0):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+        self.files = {}  # path -> pehle event ka time
+        self.dirs = {}
+        self.last_event = 0.0
+        self.events = 0
+
+    def add(self, path, is_directory=False):
+        with self.condition:
+            pending = self.dirs if is_directory else self.files
+            now = time.monotonic()
+            pending.setdefault(path, now)
+            self.last_event = now
+            self.events += 1
+            self.condition.notify()
+
+    def wait_for_batch(self):
+        """
+        Block karta hai jab tak ek debounced batch ready na ho, phir (files, dirs, events) return karta hai.
+        Idle hone par thread condition par soya rehta hai, koi polling nahi.
+        """
+        with self.condition:
+            while True:
+                if not self.files and not self.dirs:
+                    self.condition.wait()
+                    continue
+                now = time.monotonic()
+                oldest = min(list(self.files.values()) + list(self.dirs.values()))
+                wait = min(self.last_event + self.debounce, oldest + self.max_delay) - now
+                if wait > 0:
+                    self.condition.wait(timeout=wait)
+                    continue
+                batch = (sorted(self.files), sorted(self.dirs), self.events)
+                self.files, self.dirs, self.events = {}, {}, 0
+                return batch
+
+class MediaEventHandler:
+    """Watchdog event handler jo supported media files aur directories ke changes collector mein daalta hai."""
+
+    def __init__(self, collector):
+        self.collector = collector
+
+    def _add(self, path, is_directory):
+        if isinstance(path, bytes):
+            path = os.fsdecode(path)
+        if is_directory or os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS:
+            self.collector.add(path, is_directory)
+
+    def dispatch(self, event):
+        if event.event_type not in ('created', 'modified', 'deleted', 'moved', 'closed'):
+            return
+        if event.is_directory and event.event_type in ('modified', 'closed'):
+            return  # Directory mtime change; andar ki files ke apne events aate hain
+        self._add(event.src_path, event.is_directory)
+        if event.event_type == 'moved':
+            self._add(event.dest_path, event.is_directory)
+
+def apply_changes(conn, writer, files, dirs, scan_options):
+    """
+    Debounced changed paths ko database par apply karta hai: deleted files/directories ki rows hatata hai,
+    nayi ya badli files (stored size/mtime/inode se compare karke) re-extract karke batched writer se likhta hai,
+    aur naye/move hoke aaye directories ka incremental scan karta hai. (written, deleted) counts return karta hai.
+    """
+    deleted = 0
+    to_extract, videos = [], []
+    with conn:
+        for directory in dirs:
+            if not os.path.isdir(directory):
+                low, high = path_prefix_range(directory)
+                deleted += conn.execute(
+                    "DELETE FROM media_metadata WHERE file_path >= ? AND file_path < ?", (low, high)
+                ).rowcount
+        for file_path in files:
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                deleted += conn.execute("DELETE FROM media_metadata WHERE file_path = ?", (file_path,)).rowcount
+                continue
+            except Exception as e:
+                print(f"Error checking file {file_path}: {e}", file=sys.stderr)
+                continue
+            signature = stored_signature(conn, file_path)
+            if signature is not None and tuple(signature[:3]) == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+                continue
+            if os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS:
+                videos.append(file_path)
+            else:
+                to_extract.append(file_path)
+
+    for file_path in to_extract:
+        try:
+            writer.add(extract_metadata(file_path))
+        except Exception as e:
+            print(f"Error processing file {file_path}: {e}", file=sys.stderr)
+    if videos:
+        for metadata in extract_videos_metadata(videos):
+            writer.add(metadata)
+    writer.flush()
+
+    for directory in dirs:
+        if os.path.isdir(directory):
+            scan_directory(directory, conn, **scan_options)
+    return len(to_extract) + len(videos), deleted
+
+def watch_directory(directory, conn, debounce=2.0, poll_interval=None, **scan_options):
+    """
+    Pehle ek incremental scan karta hai, phir filesystem events subscribe karke DB ko live rakhta hai.
+    Watchdog ke native observer (inotify/FSEvents) ko prefer karta hai; wo start na ho sake toh watchdog ka
+    PollingObserver, aur watchdog installed hi na ho toh har `poll_interval` seconds par incremental rescan.
+    Ctrl+C tak chalta hai.
+    """
+    print(f"Initial scan of {directory}")
+    scan_directory(directory, conn, **scan_options)
+
+    if Observer is None:
+        interval = poll_interval or 60.0
+        print(f"watchdog not installed, rescanning every {interval:.0f}s (pip install watchdog for live events)",
+              file=sys.stderr)
+        try:
+            while True:
+                time.sleep(interval)
+                scan_directory(directory, conn, **scan_options)
+        except KeyboardInterrupt:
+            return
+
+    collector = ChangeCollector(debounce=debounce)
+    handler = MediaEventHandler(collector)
+    observer = None
+    if poll_interval is None:
+        try:
+            observer = Observer()
+            observer.schedule(handler, directory, recursive=True)
+            observer.start()
+        except OSError as e:
+            print(f"Native filesystem events unavailable ({e}), falling back to polling", file=sys.stderr)
+            observer = None
+    if observer is None:
+        observer = PollingObserver(timeout=poll_interval or 5.0)
+        observer.schedule(handler, directory, recursive=True)
+        observer.start()
+
+    writer = MetadataWriter(conn, batch_size=scan_options.get('batch_size', 1000))
+    # Observer threads chal rahe hain, isliye rescans ka EXIF pool fork nahi, spawn se banta hai
+    subscan_options = dict(scan_options, purge=True, mp_context=multiprocessing.get_context("spawn"))
+    print(f"Watching {directory} for changes (Ctrl+C to stop)")
+    try:
+        while True:
+            files, dirs, events = collector.wait_for_batch()
+            written, deleted = apply_changes(conn, writer, files, dirs, subscan_options)
+            print(f"Coalesced {events} events into {len(files)} files and {len(dirs)} directories: "
+                  f"{written} updated, {deleted} removed", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+        observer.stop()
+        observer.join()
+
+def day_epoch(date_string, end_of_day=False):
+    """YYYY-MM-DD (local time) ko us din ke start ya end ka epoch second banata hai."""
+    day = datetime.datetime.strptime(date_string, "%Y-%m-%d")
+    if end_of_day:
+        day = day.replace(hour=23, minute=59, second=59)
+    return int(day.timestamp())
+
+def build_query(filters, columns="*", geo_index=True):
+    """
+    Filters se SQL query aur params banata hai.
+    Dates aur resolution typed columns (created_epoch, width/height) par filter hote hain taaki indexes use ho sakein.
+    `near` + `radius_km` aur `bbox` filters `geo_index` hone par media_geo R*Tree se candidates nikalte hain,
+    radius wale results ko phir haversine distance se aur bbox wale exact lat/lon range se filter kiye jaate hain.
+    ±180 longitude cross karne wale boxes do hisson mein bante hain.
+    """
+    query = f"SELECT {columns} FROM media_metadata WHERE 1=1"
     params = []
 
-    if filters.get('date_from') and filters.get('date_to'):
-        query += " AND date_created BETWEEN ? AND ?"
-        params.extend([filters['date_from'] + " 00:00:00", filters['date_to'] + " 23:59:59"])
+    if filters.get('date_from'):
+        query += " AND created_epoch >= ?"
+        params.append(day_epoch(filters['date_from']))
+    if filters.get('date_to'):
+        query += " AND created_epoch <= ?"
+        params.append(day_epoch(filters['date_to'], end_of_day=True))
     if filters.get('file_type'):
         query += " AND file_format = ?"
         params.append(filters['file_type'] if filters['file_type'].startswith('.') else f".{filters['file_type']}")
@@ -205,9 +1210,34 @@ def query_database(conn, filters):
         # Partial matches allow karne ke liye LIKE query use karo geolocation par (jaise latitude ya longitude)
         query += " AND geolocation LIKE ?"
         params.append(f"%{filters['location']}%")
+    if filters.get('bbox'):
+        boxes = split_antimeridian(*filters['bbox'])
+        if geo_index:
+            # R*Tree sirf candidates deta hai; float32 rounding ke kaaran exact range bhi check karo
+            clause, clause_params = geo_box_filter(boxes, geo_index=True)
+            query += f" AND {clause}"
+            params.extend(clause_params)
+        clause, clause_params = geo_box_filter(boxes, geo_index=False)
+        query += f" AND {clause}"
+        params.extend(clause_params)
+    if filters.get('near'):
+        lat, lon = filters['near']
+        radius_km = filters.get('radius_km')
+        if radius_km is None:
+            radius_km = 1.0
+        elif radius_km < 0:
+            raise ValueError(f"radius_km must not be negative: {radius_km}")
+        clause, clause_params = geo_box_filter(split_antimeridian(*radius_bbox(lat, lon, radius_km)), geo_index)
+        query += f" AND {clause} AND haversine_km(latitude, longitude, ?, ?) <= ?"
+        params.extend(clause_params + [lat, lon, radius_km])
     if filters.get('resolution'):
-        query += " AND resolution = ?"
-        params.append(filters['resolution'])
+        width, height = parse_resolution(filters['resolution'])
+        if width is not None:
+            query += " AND width = ? AND height = ?"
+            params.extend([width, height])
+        else:
+            query += " AND resolution = ?"
+            params.append(filters['resolution'])
     if filters.get('min_size') is not None and filters.get('max_size') is not None:
         query += " AND file_size BETWEEN ? AND ?"
         params.extend([filters['min_size'], filters['max_size']])
@@ -218,7 +1248,26 @@ def query_database(conn, filters):
         query += " AND file_size <= ?"
         params.append(filters['max_size'])
 
+    return query, params
+
+def explain_query(conn, filters):
+    """
+    Filters wali query ka EXPLAIN QUERY PLAN return karta hai (detail strings ki list).
+    Isse check kar sakte hain ki query index use kar rahi hai ya full table SCAN.
+    """
+    register_functions(conn)
+    query, params = build_query(filters, geo_index=has_geo_index(conn))
+    return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+
+def query_database(conn, filters):
+    """
+    Provided filters ke basis par database ko query karta hai.
+    Filters mein date range (date_created), file type, location, proximity (near/radius, bbox),
+    resolution, aur file size shamil ho sakte hain.
+    """
     try:
+        register_functions(conn)
+        query, params = build_query(filters, geo_index=has_geo_index(conn))
         cursor = conn.execute(query, params)
         rows = cursor.fetchall()
         return rows
@@ -226,23 +1275,99 @@ def query_database(conn, filters):
         print(f"Error querying database: {e}", file=sys.stderr)
         return []
 
+def stream_query(conn, filters, limit=None, offset=None, after_id=None, page_size=1000):
+    """
+    Filters wali query ko stream karta hai: (column names, rows iterator) return karta hai.
+    Rows `fetchmany(page_size)` pages mein aati hain, isliye memory result size par depend nahi karti.
+    `after_id` keyset pagination hai (id > after_id, id order mein) jo OFFSET ki tarah skipped rows
+    dobara nahi padhta; `limit`/`offset` normal LIMIT/OFFSET lagate hain.
+    """
+    register_functions(conn)
+    query, params = build_query(filters, geo_index=has_geo_index(conn))
+    if after_id is not None:
+        query += " AND id > ?"
+        params.append(after_id)
+    if limit is not None or offset is not None or after_id is not None:
+        query += " ORDER BY id"
+    if limit is not None or offset is not None:
+        query += " LIMIT ? OFFSET ?"
+        params.extend([limit if limit is not None else -1, offset or 0])
+
+    cursor = conn.execute(query, params)
+    columns = [d[0] for d in cursor.description]
+
+    def rows():
+        while True:
+            page = cursor.fetchmany(page_size)
+            if not page:
+                return
+            yield from page
+
+    return columns, rows()
+
+def write_table(columns, rows, out=sys.stdout):
+    """Rows ko purane human-readable block format mein likhta hai. (count, last id) return karta hai."""
+    count, last_id = 0, None
+    for row in rows:
+        out.write("-" * 60 + "\n"
+                  f"ID: {row[0]}\n"
+                  f"File Path: {row[1]}\n"
+                  f"Format: {row[2]}\n"
+                  f"Resolution: {row[3]}\n"
+                  f"Duration: {row[4]}\n"
+                  f"Geolocation: {row[5]}\n"
+                  f"File Size: {row[6]} bytes\n"
+                  f"Date Created: {row[7]}\n"
+                  f"Date Modified: {row[8]}\n")
+        count, last_id = count + 1, row[0]
+    if count:
+        out.write("-" * 60 + "\n")
+    else:
+        out.write("No results found.\n")
+    return count, last_id
+
+def write_json(columns, rows, out=sys.stdout):
+    """Rows ko ek JSON array (har line par ek object) ke roop mein stream karta hai."""
+    count, last_id = 0, None
+    out.write("[")
+    for row in rows:
+        out.write(",\n" if count else "\n")
+        out.write(json.dumps(dict(zip(columns, row))))
+        count, last_id = count + 1, row[0]
+    out.write("\n]\n")
+    return count, last_id
+
+def write_csv(columns, rows, out=sys.stdout):
+    """Header ke saath rows ko CSV mein stream karta hai."""
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    count, last_id = 0, None
+    for row in rows:
+        writer.writerow(row)
+        count, last_id = count + 1, row[0]
+    return count, last_id
+
+OUTPUT_WRITERS = {
+    'table': write_table,
+    'json': write_json,
+    'csv': write_csv,
+}
+
 def print_results(rows):
     """Formatted manner mein query results print karta hai."""
-    if not rows:
-        print("No results found.")
-        return
-    for row in rows:
-        print("-" * 60)
-        print(f"ID: {row[0]}")
-        print(f"File Path: {row[1]}")
-        print(f"Format: {row[2]}")
-        print(f"Resolution: {row[3]}")
-        print(f"Duration: {row[4]}")
-        print(f"Geolocation: {row[5]}")
-        print(f"File Size: {row[6]} bytes")
-        print(f"Date Created: {row[7]}")
-        print(f"Date Modified: {row[8]}")
-    print("-" * 60)
+    write_table(None, rows)
+
+def coordinates(count):
+    """Argparse type banata hai jo "a,b,..." ko `count` floats ke tuple mein parse karta hai."""
+    def parse(text):
+        try:
+            values = tuple(float(v) for v in text.split(','))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected {count} comma-separated numbers, got {text!r}")
+        if len(values) != count:
+            raise argparse.ArgumentTypeError(f"expected {count} comma-separated numbers, got {text!r}")
+        return values
+    return parse
 
 def main():
     # Argparse ka use karke CLI define karo with two subcommands: 'scan' aur 'query'
@@ -255,6 +1380,51 @@ def main():
     scan_parser = subparsers.add_parser("scan", help="Scan directories to extract metadata")
     scan_parser.add_argument("directory", help="Directory to scan for multimedia files")
     scan_parser.add_argument("--db", default="media_metadata.db", help="Path to SQLite database file")
+    scan_parser.add_argument("--workers", type=int, default=8,
+                             help="Threads for IO/subprocess-bound extraction (ffprobe, audio)")
+    scan_parser.add_argument("--exif-processes", type=int, default=None,
+                             help="Processes for EXIF parsing (default: CPU count, 0 = use the thread pool)")
+    scan_parser.add_argument("--full", action="store_true",
+                             help="Re-extract every file instead of skipping unchanged ones")
+    scan_parser.add_argument("--verify-hash", action="store_true",
+                             help="Also compare content hashes before treating a file as unchanged")
+    scan_parser.add_argument("--no-purge", action="store_true",
+                             help="Keep rows for files that no longer exist on disk")
+
+    scan_parser.add_argument("--video-batch-size", type=int, default=VIDEO_BATCH_SIZE,
+                             help="Videos probed per ffmpeg process (1 = one ffprobe per file)")
+    scan_parser.add_argument("--batch-size", type=int, default=1000, help="Rows per write transaction")
+    scan_parser.add_argument("--flush-interval", type=float, default=2.0,
+                             help="Commit buffered rows at least this often (seconds)")
+
+    # Subcommand for keeping the database live with filesystem events
+    watch_parser = subparsers.add_parser("watch", help="Scan once, then keep the database updated as files change")
+    watch_parser.add_argument("directory", help="Directory to watch for multimedia files")
+    watch_parser.add_argument("--db", default="media_metadata.db", help="Path to SQLite database file")
+    watch_parser.add_argument("--debounce", type=float, default=2.0,
+                              help="Seconds of quiet before a batch of changes is applied")
+    watch_parser.add_argument("--poll-interval", type=float, default=None,
+                              help="Force polling every N seconds instead of native filesystem events")
+    watch_parser.add_argument("--workers", type=int, default=8,
+                              help="Threads for IO/subprocess-bound extraction during scans")
+    watch_parser.add_argument("--exif-processes", type=int, default=None,
+                              help="Processes for EXIF parsing during scans (0 = use the thread pool)")
+
+    # Subcommand for benchmarking database writes
+    bench_parser = subparsers.add_parser("bench-write", help="Benchmark database insert throughput")
+    bench_parser.add_argument("--rows", type=int, default=100000, help="Synthetic rows for the batched writer")
+    bench_parser.add_argument("--baseline-rows", type=int, default=2000,
+                              help="Synthetic rows for the per-row commit baseline")
+    bench_parser.add_argument("--batch-size", type=int, default=1000, help="Rows per write transaction")
+    bench_parser.add_argument("--dir", default=None, help="Directory for temporary benchmark databases")
+
+    # Subcommand for benchmarking metadata extraction
+    bench_extract_parser = subparsers.add_parser("bench-extract",
+                                                 help="Benchmark metadata extraction on a synthetic corpus")
+    bench_extract_parser.add_argument("--images", type=int, default=2000, help="Synthetic JPEGs to generate")
+    bench_extract_parser.add_argument("--videos", type=int, default=50,
+                                      help="Synthetic clips to generate (needs ffmpeg)")
+    bench_extract_parser.add_argument("--dir", default=None, help="Directory for the temporary corpus")
 
     # Subcommand for querying the metadata database
     query_parser = subparsers.add_parser("query", help="Query the metadata database")
@@ -263,12 +1433,33 @@ def main():
     query_parser.add_argument("--date_to", help="End date (YYYY-MM-DD) for file creation filter")
     query_parser.add_argument("--file_type", help="Filter by file type (e.g., jpg, mp4)")
     query_parser.add_argument("--location", help="Filter by geolocation (partial match, e.g., latitude or longitude)")
+    query_parser.add_argument("--near", type=coordinates(2), metavar="LAT,LON",
+                              help="Only files geotagged within --radius km of this point (use --near=LAT,LON for negative values)")
+    query_parser.add_argument("--radius", type=float, default=1.0, help="Radius in km for --near (default: 1)")
+    query_parser.add_argument("--bbox", type=coordinates(4), metavar="MIN_LAT,MIN_LON,MAX_LAT,MAX_LON",
+                              help="Only files geotagged inside this bounding box")
     query_parser.add_argument("--resolution", help="Filter by resolution (e.g., 1920x1080)")
     query_parser.add_argument("--min_size", type=int, help="Minimum file size in bytes")
     query_parser.add_argument("--max_size", type=int, help="Maximum file size in bytes")
+    query_parser.add_argument("--format", choices=sorted(OUTPUT_WRITERS), default="table",
+                              help="Output format (default: table)")
+    query_parser.add_argument("--limit", type=int, help="Return at most this many rows")
+    query_parser.add_argument("--offset", type=int, help="Skip this many rows (prefer --after-id for deep pages)")
+    query_parser.add_argument("--after-id", type=int,
+                              help="Keyset pagination: only rows with id greater than this, in id order")
+    query_parser.add_argument("--explain", action="store_true",
+                              help="Print the SQLite query plan instead of running the query")
 
     args = parser.parse_args()
 
+    if args.command == "bench-write":
+        benchmark_writer(rows=args.rows, batch_size=args.batch_size,
+                         baseline_rows=args.baseline_rows, directory=args.dir)
+        return
+    if args.command == "bench-extract":
+        benchmark_extract(images=args.images, videos=args.videos, directory=args.dir)
+        return
+
     # SQLite database se connect karo
     try:
         conn = sqlite3.connect(args.db)
@@ -276,6 +1467,9 @@ def main():
         print(f"Error connecting to database {args.db}: {e}", file=sys.stderr)
         sys.exit(1)
 
+    # WAL aur write pragmas set karo
+    configure_connection(conn)
+
     # Agar table na ho toh create karo
     create_table(conn)
 
@@ -286,8 +1480,17 @@ def main():
             print(f"The directory {args.directory} does not exist.", file=sys.stderr)
             sys.exit(1)
         print(f"Scanning directory: {args.directory}")
-        scan_directory(args.directory, conn)
+        scan_directory(args.directory, conn, workers=args.workers, exif_processes=args.exif_processes,
+                       incremental=not args.full, verify_hash=args.verify_hash, purge=not args.no_purge,
+                       batch_size=args.batch_size, flush_interval=args.flush_interval,
+                       video_batch_size=args.video_batch_size)
         print("Scanning completed.")
+    elif args.command == "watch":
+        if not os.path.isdir(args.directory):
+            print(f"The directory {args.directory} does not exist.", file=sys.stderr)
+            sys.exit(1)
+        watch_directory(args.directory, conn, debounce=args.debounce, poll_interval=args.poll_interval,
+                        workers=args.workers, exif_processes=args.exif_processes)
     elif args.command == "query":
         # Provided CLI arguments se filters prepare karo
         filters = {
@@ -295,16 +1498,34 @@ def main():
             'date_to': args.date_to,
             'file_type': args.file_type,
             'location': args.location,
+            'near': args.near,
+            'radius_km': args.radius if args.near else None,
+            'bbox': args.bbox,
             'resolution': args.resolution,
             'min_size': args.min_size,
             'max_size': args.max_size,
         }
-        print("Querying database with filters:")
+        # JSON/CSV output stdout par saaf rehna chahiye, isliye baaki info stderr par
+        info = sys.stdout if args.format == "table" else sys.stderr
+        print("Querying database with filters:", file=info)
         for key, value in filters.items():
             if value is not None:
-                print(f"  {key}: {value}")
-        results = query_database(conn, filters)
-        print_results(results)
+                print(f"  {key}: {value}", file=info)
+        # Explain aur query dono build_query se guzarte hain, isliye galat dates dono mein ek jaisi fail hoti hain
+        try:
+            if args.explain:
+                for detail in explain_query(conn, filters):
+                    print(f"  {detail}")
+                count = last_id = None
+            else:
+                columns, rows = stream_query(conn, filters, limit=args.limit, offset=args.offset,
+                                             after_id=args.after_id)
+                count, last_id = OUTPUT_WRITERS[args.format](columns, rows, sys.stdout)
+        except Exception as e:
+            print(f"Error querying database: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.limit is not None and count == args.limit and last_id is not None:
+            print(f"Next page: --after-id {last_id}", file=sys.stderr)
     else:
         parser.print_help()
 
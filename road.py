@@ -1,8 +1,18 @@
+import sys
 import json
+import time
+import argparse
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from collections import OrderedDict
+from itertools import chain
+from dataclasses import dataclass
+from typing import List, Dict, Tuple, Optional
+import numpy as np
 import pandas as pd
 import networkx as nx
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import Delaunay
 from sklearn.ensemble import RandomForestClassifier
 from datetime import datetime
 
@@ -17,14 +27,89 @@ CONFIG = {
     "signal_hysteresis": {
         "green_threshold": 25,
         "red_threshold": 10
+    },
+    "congestion": {
+        "saturation_vehicles": 40,  # Queue length at which a node counts as fully congested
+        "default_adjacent": 0.7     # Used for signals whose node is not in the city graph
     }
 }
 
+@dataclass
+class VehicleColumns:
+    """Struct-of-arrays view of one tick's vehicle movements."""
+    vehicle_ids: List[str]
+    speed: np.ndarray
+    speed_values: list  # As given, so messages print 65 rather than 65.0
+    speed_limit: np.ndarray
+    wrong_way: np.ndarray
+    zones: List[str]
+    current_nodes: List[str]
+    destination_nodes: List[str]
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, list]) -> 'VehicleColumns':
+        """Build from a dict of equal-length lists keyed like the vehicle movement fields."""
+        zones = list(columns['zone'])
+        limits = CONFIG['speed_limits']
+        codes, unique_zones = pd.factorize(pd.Series(zones, dtype=object))
+        # factorize codes a missing (None/NaN) zone as -1, so the default limit goes in the last slot
+        zone_limits = np.array([limits.get(zone, limits['default']) for zone in unique_zones]
+                               + [limits['default']], dtype=np.float64)
+        return cls(
+            vehicle_ids=list(columns['vehicle_id']),
+            speed=np.asarray(columns['speed'], dtype=np.float64),
+            speed_values=list(columns['speed']),
+            speed_limit=zone_limits[codes] if len(codes) else np.zeros(0),
+            wrong_way=np.asarray(columns['direction'], dtype=object) == 'wrong-way',
+            zones=zones,
+            current_nodes=list(columns['current_node']),
+            destination_nodes=list(columns['destination_node']),
+        )
+
+    @classmethod
+    def from_records(cls, movements: List[Dict]) -> 'VehicleColumns':
+        fields = ['vehicle_id', 'speed', 'direction', 'zone', 'current_node', 'destination_node']
+        return cls.from_columns({field: [vm[field] for vm in movements] for field in fields})
+
+    def violations(self) -> List[str]:
+        """Speed and wrong-way violations in vehicle order, found with array masks."""
+        speeding = self.speed > self.speed_limit
+        violations = []
+        for i in np.flatnonzero(speeding | self.wrong_way).tolist():
+            if speeding[i]:
+                violations.append(f"Speed violation ({self.speed_values[i]}km/h in {self.zones[i]})")
+            if self.wrong_way[i]:
+                violations.append("Wrong-way driving")
+        return violations
+
+@dataclass
+class SignalColumns:
+    """Struct-of-arrays view of one tick's traffic signals, with node ids resolved to graph indices."""
+    node_ids: List[str]
+    nodes: np.ndarray
+    vehicles_waiting: np.ndarray
+    green: np.ndarray
+
+    @classmethod
+    def from_records(cls, signals: List[Dict], node_index: Dict[str, int]) -> 'SignalColumns':
+        node_ids = [s['node_id'] for s in signals]
+        lookup = node_index.get
+        return cls(
+            node_ids=node_ids,
+            nodes=np.fromiter((lookup(node_id, -1) for node_id in node_ids), dtype=np.intp, count=len(signals)),
+            vehicles_waiting=np.array([s['vehicles_waiting'] for s in signals], dtype=np.float64),
+            green=np.array([s['signal_status'] == 'green' for s in signals], dtype=bool),
+        )
+
 class TrafficManager(ABC):
     @abstractmethod
     def adjust_signals(self, signals: List[Dict]) -> List[Dict]:
         pass
 
+    def set_graph(self, city_graph: nx.Graph):
+        """Called by ITMS with the city graph; strategies that need topology override this."""
+        pass
+
 class RuleBasedTraffic(TrafficManager):
     def adjust_signals(self, signals: List[Dict]) -> List[Dict]:
         for signal in signals:
@@ -38,9 +123,24 @@ class RuleBasedTraffic(TrafficManager):
         return signals
 
 class MLTraffic(TrafficManager):
-    def __init__(self, model_path: str = None):
+    """
+    Signal control with a classifier over (hour, vehicles_waiting, adjacent_congestion).
+
+    Per-node state lives in preallocated numpy arrays indexed like the city
+    graph's nodes. A node's congestion is its queue length divided by
+    saturation_vehicles (capped at 1). Its adjacent congestion is the mean
+    congestion of its neighbours, computed for every node at once as a
+    row-normalized sparse adjacency matrix times the congestion vector.
+    Features reach the model as one contiguous float64 array.
+    """
+
+    def __init__(self, model_path: str = None, city_graph: nx.Graph = None):
         self.model = self._load_model(model_path)
         self.features = ['hour', 'vehicles_waiting', 'adjacent_congestion']
+        self.saturation = CONFIG['congestion']['saturation_vehicles']
+        self.default_adjacent = CONFIG['congestion']['default_adjacent']
+        self._feature_buffer = np.empty((0, len(self.features)))
+        self.set_graph(city_graph if city_graph is not None else nx.Graph())
         
         if model_path is None:
             self._train_dummy_model()
@@ -49,24 +149,61 @@ class MLTraffic(TrafficManager):
         return RandomForestClassifier() if path is None else pd.read_pickle(path)
     
     def _train_dummy_model(self):
-        X_dummy = pd.DataFrame({
-            'hour': [8, 8, 18, 18, 12, 12],
-            'vehicles_waiting': [30, 5, 35, 8, 25, 15],
-            'adjacent_congestion': [0.8, 0.3, 0.9, 0.2, 0.6, 0.4]
-        })
+        X_dummy = np.array([
+            [8, 30, 0.8], [8, 5, 0.3], [18, 35, 0.9],
+            [18, 8, 0.2], [12, 25, 0.6], [12, 15, 0.4]
+        ], dtype=np.float64)
         y_dummy = [1, 0, 1, 0, 1, 0]
         self.model.fit(X_dummy, y_dummy)
 
-    def _prepare_features(self, signals: List[Dict]) -> pd.DataFrame:
-        return pd.DataFrame([{
-            'hour': datetime.now().hour,
-            'vehicles_waiting': s['vehicles_waiting'],
-            'adjacent_congestion': self._get_adjacent_congestion(s['node_id'])
-        } for s in signals])
+    def set_graph(self, city_graph: nx.Graph):
+        nodes = list(city_graph.nodes)
+        self.node_index = {node: i for i, node in enumerate(nodes)}
+        n = len(nodes)
+        rows, cols = [], []
+        for u, v in city_graph.edges:
+            rows += [self.node_index[u], self.node_index[v]]
+            cols += [self.node_index[v], self.node_index[u]]
+        adjacency = csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+        adjacency.data[:] = 1.0  # Duplicate (u, v) pairs from u->v plus v->u collapse to one neighbour
+        degree = np.asarray(adjacency.sum(axis=1)).ravel()
+        inverse_degree = np.divide(1.0, degree, out=np.zeros(n), where=degree > 0)
+        self.adjacency = (diags(inverse_degree) @ adjacency).tocsr()
+        self.vehicles = np.zeros(n)
+        self.congestion = np.zeros(n)
+        self.adjacent_congestion = np.zeros(n)
+
+    def node_indices(self, node_ids: List[str]) -> np.ndarray:
+        """Graph index of each node id, or -1 for nodes the graph does not contain."""
+        lookup = self.node_index.get
+        return np.fromiter((lookup(node_id, -1) for node_id in node_ids), dtype=np.intp, count=len(node_ids))
+
+    def update_state(self, indices: np.ndarray, vehicles: np.ndarray):
+        """Record the latest queue lengths and recompute congestion and adjacent congestion for all nodes."""
+        known = indices >= 0
+        self.vehicles[indices[known]] = vehicles[known]
+        np.minimum(self.vehicles / self.saturation, 1.0, out=self.congestion)
+        self.adjacent_congestion = self.adjacency @ self.congestion
+
+    def build_features(self, indices: np.ndarray, vehicles: np.ndarray, hour: int = None) -> np.ndarray:
+        """Feature matrix for signals at the given node indices, written into a reused contiguous buffer."""
+        self.update_state(indices, vehicles)
+        if self._feature_buffer.shape[0] != len(indices):
+            self._feature_buffer = np.empty((len(indices), len(self.features)))
+        X = self._feature_buffer
+        X[:, 0] = datetime.now().hour if hour is None else hour
+        X[:, 1] = vehicles
+        X[:, 2] = np.where(indices >= 0, self.adjacent_congestion[indices], self.default_adjacent)
+        return X
+
+    def _prepare_features(self, signals: List[Dict]) -> np.ndarray:
+        indices = self.node_indices([s['node_id'] for s in signals])
+        vehicles = np.fromiter((s['vehicles_waiting'] for s in signals), dtype=np.float64, count=len(signals))
+        return self.build_features(indices, vehicles)
 
     def _get_adjacent_congestion(self, node_id: str) -> float:
-        # Replace with actual API call to traffic sensors
-        return 0.7
+        index = self.node_index.get(node_id)
+        return self.default_adjacent if index is None else float(self.adjacent_congestion[index])
 
     def adjust_signals(self, signals: List[Dict]) -> List[Dict]:
         X = self._prepare_features(signals)
@@ -80,76 +217,249 @@ class MLTraffic(TrafficManager):
         return signals
 
 class EmergencyHandler:
-    def __init__(self, city_graph: nx.Graph):
+    def __init__(self, city_graph: nx.Graph, node_index: Dict[str, int] = None):
         self.city_graph = city_graph
+        # ITMS passes the node index it shares with RouteAdvisor, so SignalColumns positions agree
+        self.node_index = node_index if node_index is not None else {
+            node: i for i, node in enumerate(city_graph.nodes)}
 
     def prioritize_emergencies(self, emergencies: List[Dict], signals: List[Dict]) -> List[Dict]:
+        columns = SignalColumns.from_records(signals, self.node_index)
+        for position in self.corridor_signals(emergencies, columns):
+            signals[position]['signal_status'] = 'green'
+        return signals
+
+    def corridor_signals(self, emergencies: List[Dict], signals: SignalColumns) -> List[int]:
+        """
+        Turn signals green along emergency routes and return the positions changed.
+
+        Each route is marked in a boolean node-index mask, so finding the
+        first non-green signal on it is one array lookup over all signals
+        rather than a list scan of the path per signal.
+        """
         # Prioritize by emergency type and proximity
         sorted_emergencies = sorted(emergencies,
             key=lambda x: (x['type'] != 'ambulance', x['distance_to_destination']))
         
+        on_path = np.zeros(len(self.node_index) + 1, dtype=bool)  # Last slot stays False for unknown nodes (-1)
+        changed = []
         for ev in sorted_emergencies:
             try:
                 path = nx.shortest_path(self.city_graph,
                                        ev['current_node'],
                                        ev['destination_node'])
-                for s in signals:
-                    if s['node_id'] in path and s['signal_status'] != 'green':
-                        s['signal_status'] = 'green'
-                        break  # Prevent overriding by lower priority emergencies
             except nx.NetworkXNoPath:
                 continue
-        return signals
+            path_nodes = [self.node_index[node] for node in path]
+            on_path[path_nodes] = True
+            candidates = np.flatnonzero(on_path[signals.nodes] & ~signals.green)
+            on_path[path_nodes] = False
+            if len(candidates):
+                # Only the first one, to prevent overriding by lower priority emergencies
+                signals.green[candidates[0]] = True
+                changed.append(int(candidates[0]))
+        return changed
 
 class RouteAdvisor:
-    def __init__(self, city_graph: nx.Graph):
+    """
+    Congestion-aware routing over an array snapshot of the city graph.
+
+    The cost of entering a node is hop_cost plus its congestion score, so
+    every edge into node v weighs hop_cost + congestion[v]. The per-hop cost
+    makes equally congested routes prefer fewer hops instead of tying at
+    zero and zig-zagging. Edges are stored reversed (v -> u for each
+    road u -> v) in CSR form. A congestion update therefore overwrites just
+    v's row of weights, and one reverse Dijkstra from a destination gives
+    the next hop toward it from every node.
+
+    Shortest-path trees are cached per destination (LRU). On lookup, a
+    cached tree is reused unless a node whose weight changed since it was
+    built either lies on the tree or now offers a shorter way in for one of
+    its predecessors. Call refresh_graph() after changing the graph's
+    nodes or edges. A node_index dict passed in is renumbered in place by
+    refresh_graph(), so components sharing it stay consistent.
+    """
+
+    def __init__(self, city_graph: nx.Graph, max_cached_trees: int = 1024, node_index: Dict[str, int] = None,
+                 hop_cost: float = 1.0):
         self.city_graph = city_graph
+        self.max_cached_trees = max_cached_trees
+        self.hop_cost = hop_cost
         self.congestion = {}
+        self.node_index = node_index if node_index is not None else {}
+        self.refresh_graph()
+
+    def refresh_graph(self):
+        self.nodes = list(self.city_graph.nodes)
+        self.node_index.clear()
+        self.node_index.update((node, i) for i, node in enumerate(self.nodes))
+        n = len(self.nodes)
+        edges = [(self.node_index[u], self.node_index[v]) for u, v in self.city_graph.edges]
+        if not self.city_graph.is_directed():
+            edges += [(v, u) for u, v in edges]
+        edges = np.array(sorted(set(edges)), dtype=np.int32).reshape(-1, 2)
+        heads, tails = edges[:, 1], edges[:, 0]
+        order = np.lexsort((tails, heads))
+        # Row v of the reversed graph lists every node u with a road u -> v
+        self.predecessors = tails[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(heads, minlength=n))]).astype(np.int32)
+        self.weights = np.full(n, float(self.hop_cost))
+        for node_id, score in self.congestion.items():
+            if node_id in self.node_index:
+                self.weights[self.node_index[node_id]] = self.hop_cost + score
+        self.reverse_graph = csr_matrix(
+            (np.repeat(self.weights, np.diff(self.indptr)), self.predecessors, self.indptr), shape=(n, n))
+        self.changed_at = np.zeros(n, dtype=np.int64)
+        self.version = 0
+        self.trees = OrderedDict()
+
+    def _row_positions(self, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions in the reversed CSR arrays of every edge into the given nodes, and each node's edge count."""
+        starts = self.indptr[nodes]
+        counts = self.indptr[nodes + 1] - starts
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(starts, counts) + offsets, counts
 
     def update_congestion(self, node_id: str, vehicles: int):
-        self.congestion[node_id] = vehicles * 0.8  # Convert to congestion score
+        score = vehicles * 0.8  # Convert to congestion score
+        self.congestion[node_id] = score
+        index = self.node_index.get(node_id)
+        cost = self.hop_cost + score
+        if index is None or self.weights[index] == cost:
+            return
+        self.version += 1
+        self.weights[index] = cost
+        self.changed_at[index] = self.version
+        self.reverse_graph.data[self.indptr[index]:self.indptr[index + 1]] = cost
 
-    def suggest_route(self, origin: str, destination: str) -> List[str]:
-        for u, v, d in self.city_graph.edges(data=True):
-            d['weight'] = self.congestion.get(v, 0)
-        
-        try:
-            return nx.shortest_path(self.city_graph, origin, destination, weight='weight')
-        except nx.NetworkXNoPath:
+    def update_congestion_many(self, node_ids: List[str], nodes: np.ndarray, vehicles: np.ndarray):
+        """update_congestion for a whole tick of signals; nodes holds graph indices (-1 if unknown)."""
+        scores = vehicles * 0.8
+        self.congestion.update(zip(node_ids, scores.tolist()))
+        known = nodes >= 0
+        nodes, scores = nodes[known], scores[known]
+        # A node listed twice keeps its last score, like sequential update_congestion calls
+        _, last_from_end = np.unique(nodes[::-1], return_index=True)
+        last = len(nodes) - 1 - last_from_end
+        nodes, costs = nodes[last], self.hop_cost + scores[last]
+        changed = self.weights[nodes] != costs
+        if not changed.any():
+            return
+        nodes, costs = nodes[changed], costs[changed]
+        self.version += 1
+        self.weights[nodes] = costs
+        self.changed_at[nodes] = self.version
+        # Only the rows of nodes whose cost changed are rewritten
+        positions, counts = self._row_positions(nodes)
+        self.reverse_graph.data[positions] = np.repeat(costs, counts)
+
+    def _tree_is_valid(self, tree) -> bool:
+        version, dist, _, on_tree = tree
+        changed = np.flatnonzero(self.changed_at > version)
+        if len(changed) == 0:
+            return True
+        if on_tree[changed].any():
+            return False
+        # Off-tree nodes only matter if entering them is now a shortcut for a predecessor
+        positions, counts = self._row_positions(changed)
+        preds = self.predecessors[positions]
+        via = np.repeat(dist[changed] + self.weights[changed], counts)
+        return not np.any(via < dist[preds])
+
+    def _trees_for(self, destinations: List[int]) -> Dict[int, tuple]:
+        """Shortest-path trees for the given destination indices, running one batched Dijkstra for all stale ones."""
+        trees = {}
+        missing = []
+        for dest in destinations:
+            tree = self.trees.get(dest)
+            if tree is not None and self._tree_is_valid(tree):
+                self.trees.move_to_end(dest)
+                trees[dest] = tree
+            else:
+                missing.append(dest)
+        if missing:
+            dist, next_hop = dijkstra(self.reverse_graph, directed=True, indices=missing,
+                                      return_predecessors=True)
+            for i, dest in enumerate(missing):
+                has_parent = next_hop[i] >= 0
+                on_tree = np.zeros(len(self.nodes), dtype=bool)
+                on_tree[next_hop[i][has_parent]] = True
+                tree = (self.version, dist[i], next_hop[i].tolist(), on_tree)
+                trees[dest] = self.trees[dest] = tree
+                self.trees.move_to_end(dest)
+            while len(self.trees) > self.max_cached_trees:
+                self.trees.popitem(last=False)
+        return trees
+
+    def _path(self, origin: int, dest: int, tree) -> List[str]:
+        next_hop = tree[2]  # plain list: much faster than indexing numpy scalars in this loop
+        if origin != dest and next_hop[origin] < 0:
             return []
+        path = [origin]
+        while path[-1] != dest:
+            path.append(next_hop[path[-1]])
+        return [self.nodes[i] for i in path]
+
+    def _index(self, node_id: str) -> int:
+        if node_id not in self.node_index:
+            raise nx.NodeNotFound(f"Node {node_id} not in graph")
+        return self.node_index[node_id]
+
+    def suggest_route(self, origin: str, destination: str) -> List[str]:
+        return self.suggest_routes([(origin, destination)])[0]
+
+    def suggest_routes(self, trips: List[Tuple[str, str]]) -> List[List[str]]:
+        """Routes for many (origin, destination) pairs; trips sharing a destination share one search."""
+        pairs = [(self._index(origin), self._index(destination)) for origin, destination in trips]
+        trees = self._trees_for(list(dict.fromkeys(dest for _, dest in pairs)))
+        return [self._path(origin, dest, trees[dest]) for origin, dest in pairs]
 
 class ITMS:
     def __init__(self, strategy: TrafficManager, city_graph: nx.Graph):
         self.strategy = strategy
+        self.strategy.set_graph(city_graph)
         self.city_graph = city_graph
-        self.emergency_handler = EmergencyHandler(city_graph)
-        self.route_advisor = RouteAdvisor(city_graph)
+        # One numbering of the graph's nodes, shared by every component that works on node indices
+        self.node_index = {node: i for i, node in enumerate(city_graph.nodes)}
+        self.emergency_handler = EmergencyHandler(city_graph, self.node_index)
+        self.route_advisor = RouteAdvisor(city_graph, node_index=self.node_index)
 
-    def process_data(self, data: Dict) -> Dict:
+    def process_data(self, data: Dict, timings: Optional[Dict[str, float]] = None) -> Dict:
+        """
+        Process one tick. vehicle_movements may be a list of records or, for
+        large ticks, a dict of columns (field name -> list of values).
+        If timings is given, the seconds spent in each stage are stored in it.
+        """
+        clock = time.perf_counter
+        start = clock()
+        
         # 1. Adjust signals
         data['traffic_signals'] = self.strategy.adjust_signals(data['traffic_signals'])
+        signals = SignalColumns.from_records(data['traffic_signals'], self.node_index)
+        signals_done = clock()
         
         # 2. Handle emergencies with priority
-        data['traffic_signals'] = self.emergency_handler.prioritize_emergencies(
-            data['emergency_vehicles'], data['traffic_signals'])
+        for position in self.emergency_handler.corridor_signals(data['emergency_vehicles'], signals):
+            data['traffic_signals'][position]['signal_status'] = 'green'
+        emergencies_done = clock()
         
         # 3. Detect violations with zone-aware speed limits
-        violations = []
-        for vm in data['vehicle_movements']:
-            speed_limit = CONFIG['speed_limits'].get(vm['zone'], CONFIG['speed_limits']['default'])
-            if vm['speed'] > speed_limit:
-                violations.append(f"Speed violation ({vm['speed']}km/h in {vm['zone']})")
-            if vm['direction'] == 'wrong-way':
-                violations.append("Wrong-way driving")
+        movements = data['vehicle_movements']
+        vehicles = (VehicleColumns.from_columns(movements) if isinstance(movements, dict)
+                    else VehicleColumns.from_records(movements))
+        violations = vehicles.violations()
+        violations_done = clock()
         
         # 4. Update routing and suggest paths
-        route_suggestions = {}
-        for signal in data['traffic_signals']:
-            self.route_advisor.update_congestion(signal['node_id'], signal['vehicles_waiting'])
+        self.route_advisor.update_congestion_many(signals.node_ids, signals.nodes, signals.vehicles_waiting)
+        routes = self.route_advisor.suggest_routes(list(zip(vehicles.current_nodes, vehicles.destination_nodes)))
+        route_suggestions = dict(zip(vehicles.vehicle_ids, routes))
         
-        for vm in data['vehicle_movements']:
-            route = self.route_advisor.suggest_route(vm['current_node'], vm['destination_node'])
-            route_suggestions[vm['vehicle_id']] = route
+        if timings is not None:
+            timings['signals'] = signals_done - start
+            timings['emergencies'] = emergencies_done - signals_done
+            timings['violations'] = violations_done - emergencies_done
+            timings['routing'] = clock() - violations_done
         
         return {
             'adjusted_signals': data['traffic_signals'],
@@ -158,8 +468,212 @@ class ITMS:
             'emergency_priorities': [ev['id'] for ev in data['emergency_vehicles']]
         }
 
-# Example Usage
-if __name__ == "__main__":
+STAGES = ['decode', 'signals', 'emergencies', 'violations', 'routing']
+
+def grid_city(width: int, height: int) -> nx.DiGraph:
+    """A width x height grid of two-way streets with nodes named 'r_c'."""
+    grid = nx.DiGraph(nx.grid_2d_graph(height, width))
+    return nx.relabel_nodes(grid, {node: f"{node[0]}_{node[1]}" for node in grid})
+
+def planar_city(n_nodes: int, seed: int = 42) -> nx.DiGraph:
+    """Two-way streets along the Delaunay triangulation of random points, with nodes named 'n<i>'."""
+    rng = np.random.default_rng(seed)
+    points = rng.random((n_nodes, 2))
+    triangles = Delaunay(points).simplices
+    edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    city_graph = nx.DiGraph()
+    city_graph.add_nodes_from((f"n{i}", {'pos': tuple(p)}) for i, p in enumerate(points.tolist()))
+    city_graph.add_edges_from((f"n{u}", f"n{v}") for u, v in edges.tolist())
+    city_graph.add_edges_from((f"n{v}", f"n{u}") for u, v in edges.tolist())
+    return city_graph
+
+def build_city(kind: str, n_nodes: int, seed: int = 42) -> nx.DiGraph:
+    if kind == 'grid':
+        side = int(np.ceil(np.sqrt(n_nodes)))
+        return grid_city(side, side)
+    if kind == 'planar':
+        return planar_city(n_nodes, seed)
+    raise ValueError(f"Unknown city type: {kind}")
+
+def traffic_feed(city_graph: nx.Graph, ticks: int, n_signals: int = 1000, n_vehicles: int = 10000,
+                 n_destinations: int = 50, emergency_rate: float = 0.5, columnar: bool = False, seed: int = 42):
+    """
+    Yield synthetic ticks in process_data's input format.
+
+    Signals sit at a fixed random set of nodes and their queues drift from
+    tick to tick. Vehicles head for a small set of popular destinations,
+    with speeds scattered around their zone's limit and about 1% driving
+    the wrong way. Each tick has a Poisson(emergency_rate) number of emergencies.
+    With columnar=True, vehicle_movements is a dict of columns.
+    """
+    rng = np.random.default_rng(seed)
+    nodes = np.array(list(city_graph.nodes), dtype=object)
+    signal_nodes = rng.choice(nodes, size=min(n_signals, len(nodes)), replace=False).tolist()
+    destinations = rng.choice(nodes, size=min(n_destinations, len(nodes)), replace=False)
+    zones = np.array(list(CONFIG['speed_limits']), dtype=object)
+    zone_limits = np.array([CONFIG['speed_limits'][zone] for zone in zones], dtype=np.float64)
+    queues = rng.integers(0, 40, len(signal_nodes))
+    vehicle_ids = [f"KA{i:07d}" for i in range(n_vehicles)]
+
+    for tick in range(ticks):
+        queues = np.clip(queues + rng.integers(-5, 6, len(queues)), 0, 60)
+        zone_codes = rng.integers(0, len(zones), n_vehicles)
+        speeds = np.round(zone_limits[zone_codes] * rng.normal(0.9, 0.15, n_vehicles)).astype(int)
+        columns = {
+            'vehicle_id': vehicle_ids,
+            'speed': speeds.tolist(),
+            'direction': np.where(rng.random(n_vehicles) < 0.01, 'wrong-way', 'correct').tolist(),
+            'current_node': rng.choice(nodes, n_vehicles).tolist(),
+            'destination_node': rng.choice(destinations, n_vehicles).tolist(),
+            'zone': zones[zone_codes].tolist(),
+        }
+        movements = columns if columnar else [dict(zip(columns, values)) for values in zip(*columns.values())]
+        yield {
+            'tick': tick,
+            'traffic_signals': [
+                {'node_id': node_id, 'vehicles_waiting': int(q), 'signal_status': 'red'}
+                for node_id, q in zip(signal_nodes, queues.tolist())
+            ],
+            'emergency_vehicles': [
+                {'id': f"EV-{tick}-{i}", 'type': str(rng.choice(['ambulance', 'fire', 'police'])),
+                 'current_node': str(rng.choice(nodes)), 'destination_node': str(rng.choice(nodes)),
+                 'distance_to_destination': round(float(rng.random() * 10), 2)}
+                for i in range(rng.poisson(emergency_rate))
+            ],
+            'vehicle_movements': movements,
+        }
+
+def write_feed(path: str, city: Dict, ticks) -> int:
+    """Write a JSONL feed: one header line describing the city, then one line per tick."""
+    count = 0
+    with open(path, 'w') as f:
+        f.write(json.dumps({'city': city}) + '\n')
+        for tick in ticks:
+            f.write(json.dumps(tick) + '\n')
+            count += 1
+    return count
+
+def read_feed(path: str):
+    """
+    Stream (city, tick, decode_seconds) from a JSONL feed. city is the header
+    dict when present, else None. Lines that are not ticks (no
+    traffic_signals) are skipped and counted in the final skipped total.
+    """
+    city = None
+    skipped = 0
+    with open(path) as f:
+        for line in f:
+            start = time.perf_counter()
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                skipped += 1
+                continue
+            decode = time.perf_counter() - start
+            if isinstance(record, dict) and 'city' in record and 'traffic_signals' not in record:
+                city = record['city']
+            elif isinstance(record, dict) and 'traffic_signals' in record:
+                record.setdefault('emergency_vehicles', [])
+                record.setdefault('vehicle_movements', [])
+                yield city, record, decode
+            else:
+                skipped += 1
+    if skipped:
+        print(f"Skipped {skipped} lines that are not ITMS ticks", file=sys.stderr)
+
+class LatencyRecorder:
+    """Collects per-stage latencies over many ticks and reports percentiles."""
+
+    def __init__(self, stages: List[str] = STAGES):
+        self.stages = stages
+        self.samples = {stage: [] for stage in stages}
+        self.totals = []
+
+    def record(self, timings: Dict[str, float]):
+        for stage in self.stages:
+            if stage in timings:
+                self.samples[stage].append(timings[stage])
+        self.totals.append(sum(timings.values()))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for name, values in list(self.samples.items()) + [('total', self.totals)]:
+            if values:
+                ms = np.array(values) * 1000
+                report[name] = {
+                    'p50_ms': float(np.percentile(ms, 50)),
+                    'p95_ms': float(np.percentile(ms, 95)),
+                    'max_ms': float(ms.max()),
+                    'mean_ms': float(ms.mean()),
+                }
+        return report
+
+    def print_summary(self):
+        if not self.totals:
+            print("No ticks processed")
+            return
+        print(f"{len(self.totals)} ticks")
+        print(f"{'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'mean ms':>10}")
+        for name, stats in self.summary().items():
+            print(f"{name:<12}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                  f"{stats['max_ms']:>10.2f}{stats['mean_ms']:>10.2f}")
+
+def make_strategy(name: str) -> TrafficManager:
+    return MLTraffic() if name == 'ml' else RuleBasedTraffic()
+
+def run_ticks(itms: ITMS, ticks, recorder: LatencyRecorder):
+    """Feed (tick, decode_seconds) pairs through itms, recording stage latencies."""
+    for data, decode in ticks:
+        timings = {'decode': decode}
+        itms.process_data(data, timings)
+        recorder.record(timings)
+    return recorder
+
+def replay(path: str, strategy: str = 'rule', city_kind: str = 'grid', n_nodes: int = 10000, seed: int = 42):
+    """Replay a JSONL feed through ITMS. The city comes from the feed header, else from the arguments."""
+    recorder = LatencyRecorder()
+    records = read_feed(path)
+    # The city is only known once the header has been read, i.e. with the first tick
+    first = next(records, None)
+    if first is None:
+        return recorder
+    spec = first[0] or {'kind': city_kind, 'nodes': n_nodes, 'seed': seed}
+    itms = ITMS(make_strategy(strategy), build_city(spec['kind'], spec['nodes'], spec['seed']))
+    return run_ticks(itms, ((data, decode) for _, data, decode in chain([first], records)), recorder)
+
+def benchmark_ml_features(n_signals: int = 10000, ticks: int = 100, seed: int = 42):
+    """Per-tick latency of MLTraffic feature building (array and dict inputs) and model inference."""
+    side = int(np.ceil(np.sqrt(n_signals)))
+    city_graph = grid_city(side, side)
+    ml = MLTraffic(city_graph=city_graph)
+    node_ids = list(city_graph.nodes)[:n_signals]
+    indices = ml.node_indices(node_ids)
+    rng = np.random.default_rng(seed)
+    queues = rng.integers(0, 50, size=(ticks, n_signals)).astype(np.float64)
+
+    start = time.perf_counter()
+    for tick in range(ticks):
+        X = ml.build_features(indices, queues[tick], hour=8)
+    array_ms = (time.perf_counter() - start) * 1000 / ticks
+
+    signals = [{'node_id': node_id, 'vehicles_waiting': int(q), 'signal_status': 'red'}
+               for node_id, q in zip(node_ids, queues[0])]
+    start = time.perf_counter()
+    for tick in range(ticks):
+        ml._prepare_features(signals)
+    dict_ms = (time.perf_counter() - start) * 1000 / ticks
+
+    start = time.perf_counter()
+    for tick in range(min(ticks, 10)):
+        ml.model.predict(X)
+    predict_ms = (time.perf_counter() - start) * 1000 / min(ticks, 10)
+
+    print(f"{n_signals} signals on a {side}x{side} grid, {ticks} ticks:")
+    print(f"  build_features (arrays):    {array_ms:.3f}ms/tick")
+    print(f"  _prepare_features (dicts):  {dict_ms:.3f}ms/tick")
+    print(f"  model.predict:              {predict_ms:.3f}ms/tick")
+
+def run_demo():
     # Geo-aware city graph
     city_graph = nx.DiGraph()
     city_graph.add_nodes_from([
@@ -193,4 +707,52 @@ if __name__ == "__main__":
     
     # Process and output
     result = itms.process_data(input_data)
-    print(json.dumps(result, indent=2))
\ No newline at end of file
+    print(json.dumps(result, indent=2))
+
+# Example Usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intelligent traffic management system")
+    parser.add_argument('--benchmark-ml', type=int, metavar='N_SIGNALS',
+                        help="Benchmark MLTraffic feature building for N signals instead of running the demo")
+    parser.add_argument('--simulate', action='store_true',
+                        help="Run synthetic ticks on a synthetic city and report per-stage latency")
+    parser.add_argument('--generate-feed', metavar='PATH', help="Write synthetic ticks to a JSONL feed")
+    parser.add_argument('--replay', metavar='PATH', help="Replay a JSONL feed and report per-stage latency")
+    parser.add_argument('--city', choices=['grid', 'planar'], default='grid', help="Synthetic city layout")
+    parser.add_argument('--nodes', type=int, default=20000, help="Approximate number of intersections")
+    parser.add_argument('--signals', type=int, default=2000, help="Traffic signals per tick")
+    parser.add_argument('--vehicles', type=int, default=10000, help="Vehicle movements per tick")
+    parser.add_argument('--destinations', type=int, default=50, help="Distinct vehicle destinations")
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--columnar', action='store_true', help="Emit vehicle movements as columns")
+    parser.add_argument('--strategy', choices=['rule', 'ml'], default='rule')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help="Print the latency summary as JSON")
+    args = parser.parse_args()
+
+    def feed(city_graph):
+        return traffic_feed(city_graph, args.ticks, n_signals=args.signals, n_vehicles=args.vehicles,
+                            n_destinations=args.destinations, columnar=args.columnar, seed=args.seed)
+
+    recorder = None
+    if args.benchmark_ml:
+        benchmark_ml_features(args.benchmark_ml)
+    elif args.generate_feed:
+        city_graph = build_city(args.city, args.nodes, args.seed)
+        city = {'kind': args.city, 'nodes': args.nodes, 'seed': args.seed}
+        count = write_feed(args.generate_feed, city, feed(city_graph))
+        print(f"Wrote {count} ticks for a {city_graph.number_of_nodes()}-node {args.city} city to {args.generate_feed}")
+    elif args.replay:
+        recorder = replay(args.replay, args.strategy, args.city, args.nodes, args.seed)
+    elif args.simulate:
+        city_graph = build_city(args.city, args.nodes, args.seed)
+        itms = ITMS(make_strategy(args.strategy), city_graph)
+        recorder = run_ticks(itms, ((tick, 0.0) for tick in feed(city_graph)), LatencyRecorder(STAGES[1:]))
+    else:
+        run_demo()
+
+    if recorder is not None:
+        if args.json:
+            print(json.dumps(recorder.summary(), indent=2))
+        else:
+            recorder.print_summary()
\ No newline at end of file
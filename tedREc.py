@@ -9,17 +9,477 @@ import string
 from wordcloud import WordCloud
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from sklearn.decomposition import TruncatedSVD
+from scipy import sparse
+import os
 import random
+import hashlib
+from functools import lru_cache
+from itertools import filterfalse, repeat
+from concurrent.futures import ProcessPoolExecutor
+import time
+import joblib
+import argparse
 from scipy.stats import pearsonr
 
 # Download necessary NLTK resources
 nltk.download('punkt')
 nltk.download('stopwords')
 
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+@lru_cache(maxsize=None)
+def english_stopwords():
+    """NLTK English stopwords as a frozenset, loaded once per process."""
+    return frozenset(stopwords.words('english'))
+
+def preprocess_text(text, stop_words):
+    """Lowercase, strip punctuation and drop stopwords, returning the remaining words joined by spaces."""
+    return ' '.join(filterfalse(stop_words.__contains__, text.lower().translate(PUNCTUATION_TABLE).split()))
+
+def preprocess_chunk(texts, stop_words):
+    return [preprocess_text(text, stop_words) for text in texts]
+
+def description_key(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+def corpus_fingerprint(ids, titles, descriptions):
+    """Row count plus a hash of every talk's id, title and description, to tell whether an index matches a corpus."""
+    digest = hashlib.blake2b(digest_size=16)
+    rows = 0
+    for row in zip(ids, titles, descriptions):
+        for value in row:
+            digest.update(str(value).encode('utf-8'))
+            digest.update(b'\0')
+        rows += 1
+    return {'rows': rows, 'digest': digest.hexdigest()}
+
+def row_statistics(matrix):
+    """Per-row sums and squared norms of a sparse matrix, the only row stats Pearson/cosine need."""
+    row_sums = np.asarray(matrix.sum(axis=1)).ravel()
+    row_sq_norms = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+    return row_sums, row_sq_norms
+
+def combined_similarity(user_vector, matrix, row_sums=None, row_sq_norms=None):
+    """
+    Average of cosine similarity and Pearson correlation between one sparse
+    user vector and every row of a sparse matrix, computed without densifying.
+
+    Pearson over n features is a centered dot product, which expands to
+        cov = x.u - sum(x) * sum(u) / n
+        var_x = x.x - sum(x)^2 / n
+    so one sparse matrix-vector product plus per-row sums and norms gives
+    every score at once. Rows (or a query) with zero variance score 0.
+    """
+    return combined_similarity_batch(user_vector, matrix, row_sums, row_sq_norms)[0]
+
+def combined_similarity_batch(user_matrix, matrix, row_sums=None, row_sq_norms=None):
+    """combined_similarity for many users at once: returns a (users x talks) array from one sparse product."""
+    if row_sums is None or row_sq_norms is None:
+        row_sums, row_sq_norms = row_statistics(matrix)
+    dots = (user_matrix @ matrix.T).toarray()
+    user_sums, user_sq_norms = row_statistics(user_matrix)
+    return combine_scores(dots, row_sums, row_sq_norms, user_sums[:, None], user_sq_norms[:, None], matrix.shape[1])
+
+def combine_scores(dots, row_sums, row_sq_norms, user_sums, user_sq_norms, n_features):
+    """Turn raw dot products plus row/user sums and squared norms into (cosine + Pearson) / 2."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine = dots / np.sqrt(row_sq_norms * user_sq_norms)
+        covariance = dots - row_sums * (user_sums / n_features)
+        row_variance = np.maximum(row_sq_norms - row_sums ** 2 / n_features, 0)
+        user_variance = np.maximum(user_sq_norms - user_sums ** 2 / n_features, 0)
+        pearson = covariance / np.sqrt(row_variance * user_variance)
+    cosine = np.nan_to_num(cosine, nan=0.0, posinf=0.0, neginf=0.0)
+    pearson = np.nan_to_num(pearson, nan=0.0, posinf=0.0, neginf=0.0)
+    return (cosine + pearson) / 2
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first, via argpartition instead of a full sort."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=int)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+def kmeans(points, n_clusters, n_iter=10, sample_size=None, seed=42):
+    """
+    Spherical k-means (Lloyd's algorithm on unit vectors) in plain numpy.
+
+    Centroids are trained on a random sample of at most sample_size points
+    (default 256 per cluster), which is plenty for coarse quantization.
+    """
+    rng = np.random.default_rng(seed)
+    if sample_size is None:
+        sample_size = 256 * n_clusters
+    if len(points) > sample_size:
+        points = points[rng.choice(len(points), sample_size, replace=False)]
+    centroids = points[rng.choice(len(points), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = nearest_centroids(points, centroids)
+        for cluster in range(n_clusters):
+            members = points[assignment == cluster]
+            # Reseed empty clusters with a random point instead of letting them die
+            centroids[cluster] = members.sum(axis=0) if len(members) else points[rng.integers(len(points))]
+        centroids = normalize(centroids)
+    return centroids
+
+def nearest_centroids(points, centroids, chunk_size=65536):
+    """Index of the most similar centroid for each unit vector, in chunks to bound memory."""
+    return np.concatenate([
+        np.argmax(points[i:i + chunk_size] @ centroids.T, axis=1)
+        for i in range(0, len(points), chunk_size)
+    ]) if len(points) else np.array([], dtype=int)
+
+def top_k_rows(scores, k):
+    """top_k_indices for every row of a 2-D score array, returned as a (rows x k) index array."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=int)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1)
+
+class RecommendationIndex:
+    """
+    Fit-once, query-many TF-IDF index.
+
+    Holds the fitted vectorizer, the L2-normalized talk matrix and its row
+    statistics, so a query only needs one transform and one sparse product.
+    Single queries skip TfidfVectorizer.transform (whose per-call overhead
+    dominates at small catalog sizes) and weight the query terms directly
+    from the fitted vocabulary and idf, then read only the matching columns
+    from a term-major copy of the matrix.
+
+    fingerprint identifies the corpus the index was fitted on (see
+    corpus_fingerprint); it is saved with the index and cleared by add().
+
+    Rows added with add() are buffered and merged into the matrix with a
+    single vstack the next time it is read, so many small inserts cost
+    linear rather than quadratic time.
+    """
+
+    def __init__(self, vectorizer, matrix, titles, fingerprint=None):
+        self.vectorizer = vectorizer
+        self.fingerprint = fingerprint
+        self._matrix = normalize(matrix.tocsr(), norm='l2')
+        self.titles = list(titles)
+        self._row_sums, self._row_sq_norms = row_statistics(self._matrix)
+        self.pending_rows = []
+        self.n_rows = self._matrix.shape[0]
+        self.term_matrix = None
+        self.analyzer = vectorizer.build_analyzer()
+        self.vocabulary = vectorizer.vocabulary_
+        self.idf = vectorizer.idf_
+
+    @classmethod
+    def fit(cls, descriptions, titles, fingerprint=None):
+        vectorizer = TfidfVectorizer(stop_words='english')
+        matrix = vectorizer.fit_transform(descriptions)
+        return cls(vectorizer, matrix, titles, fingerprint)
+
+    @property
+    def matrix(self):
+        self._merge_pending()
+        return self._matrix
+
+    @property
+    def row_sums(self):
+        self._merge_pending()
+        return self._row_sums
+
+    @property
+    def row_sq_norms(self):
+        self._merge_pending()
+        return self._row_sq_norms
+
+    def _merge_pending(self):
+        if not self.pending_rows:
+            return
+        new_rows = sparse.vstack(self.pending_rows, format='csr')
+        self.pending_rows = []
+        self._matrix = sparse.vstack([self._matrix, new_rows], format='csr')
+        new_sums, new_sq_norms = row_statistics(new_rows)
+        self._row_sums = np.concatenate([self._row_sums, new_sums])
+        self._row_sq_norms = np.concatenate([self._row_sq_norms, new_sq_norms])
+
+    def vectorize(self, descriptions):
+        """L2-normalized TF-IDF rows for descriptions, using the fitted vocabulary and idf."""
+        return normalize(self.vectorizer.transform(descriptions), norm='l2')
+
+    def add(self, descriptions, titles):
+        """
+        Append new talks using the already-fitted vocabulary and idf (words the
+        vectorizer has never seen are ignored). Returns the new row indices.
+        """
+        return self.add_rows(self.vectorize(descriptions), titles)
+
+    def add_rows(self, rows, titles):
+        """Append already-vectorized talk rows (see vectorize). Returns the new row indices."""
+        start = self.n_rows
+        self.pending_rows.append(rows)
+        self.n_rows += rows.shape[0]
+        self.titles.extend(titles)
+        self.term_matrix = None
+        self.fingerprint = None
+        return np.arange(start, self.n_rows)
+
+    def save(self, path):
+        joblib.dump({
+            'vectorizer': self.vectorizer,
+            'matrix': self.matrix,
+            'titles': self.titles,
+            'fingerprint': self.fingerprint,
+        }, path)
+
+    @classmethod
+    def load(cls, path):
+        data = joblib.load(path)
+        return cls(data['vectorizer'], data['matrix'], data['titles'], data.get('fingerprint'))
+
+    def _results(self, scores, indices):
+        return [
+            {'title': self.titles[idx], 'similarity_score': scores[idx]}
+            for idx in indices
+        ]
+
+    def query_terms(self, user_interests):
+        """Vocabulary indices and L2-normalized TF-IDF weights of a query, same as vectorizer.transform."""
+        counts = {}
+        for token in self.analyzer(' '.join(user_interests)):
+            term = self.vocabulary.get(token)
+            if term is not None:
+                counts[term] = counts.get(term, 0) + 1
+        terms = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.idf[terms]
+        norm = np.sqrt(weights @ weights)
+        return terms, (weights / norm if norm else weights)
+
+    def scores(self, user_interests):
+        """Combined cosine + Pearson score of every talk for one list of interest keywords."""
+        terms, weights = self.query_terms(user_interests)
+        if self.term_matrix is None:
+            self.term_matrix = self.matrix.T.tocsr()
+        dots = self.term_matrix[terms].T @ weights
+        return combine_scores(dots, self.row_sums, self.row_sq_norms,
+                              weights.sum(), weights @ weights, self.matrix.shape[1])
+
+    def recommend(self, user_interests, k=5):
+        """Top k talks for one list of interest keywords."""
+        scores = self.scores(user_interests)
+        return self._results(scores, top_k_indices(scores, k))
+
+    def recommend_batch(self, users, k=5):
+        """Top k talks for each of many users, scored with a single sparse matrix product."""
+        user_matrix = self.vectorizer.transform([' '.join(interests) for interests in users])
+        scores = combined_similarity_batch(user_matrix, self.matrix, self.row_sums, self.row_sq_norms)
+        return [self._results(row, indices) for row, indices in zip(scores, top_k_rows(scores, k))]
+
+class EmbeddingIndex:
+    """
+    Approximate nearest-neighbour search over dense talk embeddings.
+
+    Talks are projected from the TF-IDF space of a RecommendationIndex into
+    n_components dimensions with TruncatedSVD and L2-normalized. An inverted
+    file (IVF) index groups them under n_lists k-means centroids. A query only
+    scans the talks of its nprobe closest centroids. With rerank, the best
+    rerank_factor * k candidates are then rescored with the exact sparse
+    cosine + Pearson score, so final rankings match RecommendationIndex
+    whenever the true neighbours are among the candidates.
+    """
+
+    def __init__(self, index, n_components=128, n_lists=None, n_iter=10, seed=42):
+        self.index = index
+        self.pending = []
+        n_talks, n_features = index.matrix.shape
+        self.svd = TruncatedSVD(n_components=min(n_components, n_features - 1), random_state=seed)
+        self._embeddings = normalize(self.svd.fit_transform(index.matrix)).astype(np.float32)
+        # Term-major copy of the SVD basis: a query embedding is just a weighted sum of its terms' rows
+        self.term_components = np.ascontiguousarray(self.svd.components_.T, dtype=np.float32)
+        n_lists = n_lists or max(1, int(np.sqrt(n_talks)))
+        self.centroids = kmeans(self.embeddings, min(n_lists, n_talks), n_iter=n_iter, seed=seed).astype(np.float32)
+        assignment = nearest_centroids(self.embeddings, self.centroids)
+        order = np.argsort(assignment, kind='stable')
+        bounds = np.searchsorted(assignment[order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    @property
+    def embeddings(self):
+        self._merge_pending()
+        return self._embeddings
+
+    def _merge_pending(self):
+        """Fold buffered inserts into the embedding array and inverted lists in one pass."""
+        if not self.pending:
+            return
+        ids, embeddings, assignment = (np.concatenate(parts) for parts in zip(*self.pending))
+        self.pending = []
+        self._embeddings = np.vstack([self._embeddings, embeddings])
+        for cluster in np.unique(assignment):
+            self.lists[cluster] = np.concatenate([self.lists[cluster], ids[assignment == cluster]])
+
+    def embed(self, rows):
+        """Unit-length embeddings of sparse TF-IDF rows."""
+        return normalize(np.asarray(rows @ self.term_components)).astype(np.float32)
+
+    def add(self, descriptions, titles):
+        """
+        Insert new talks without retraining: embed them and append each to its
+        nearest list. Inserts are buffered and merged on the next search.
+        """
+        rows = self.index.vectorize(descriptions)
+        ids = self.index.add_rows(rows, titles)
+        embeddings = self.embed(rows)
+        self.pending.append((ids, embeddings, nearest_centroids(embeddings, self.centroids)))
+        return ids
+
+    def search(self, user_interests, k=5, nprobe=8, rerank=True, rerank_factor=100):
+        """Return the ids of the approximately best k talks for a list of interest keywords."""
+        self._merge_pending()
+        terms, weights = self.index.query_terms(user_interests)
+        embedded = weights.astype(np.float32) @ self.term_components[terms]
+        norm = np.sqrt(embedded @ embedded)
+        if norm:
+            embedded /= norm
+        probes = top_k_indices(self.centroids @ embedded, nprobe)
+        candidates = np.concatenate([self.lists[cluster] for cluster in probes])
+        if len(candidates) == 0:
+            return candidates
+        similarities = self.embeddings[candidates] @ embedded
+        if not rerank:
+            return candidates[top_k_indices(similarities, k)]
+
+        candidates = candidates[top_k_indices(similarities, k * rerank_factor)]
+        query = sparse.csr_matrix((weights, terms, [0, len(terms)]), shape=(1, self.index.matrix.shape[1]))
+        dots = (self.index.matrix[candidates] @ query.T).toarray().ravel()
+        scores = combine_scores(dots, self.index.row_sums[candidates], self.index.row_sq_norms[candidates],
+                                weights.sum(), weights @ weights, query.shape[1])
+        return candidates[top_k_indices(scores, k)]
+
+    def recommend(self, user_interests, k=5, nprobe=8, rerank=True):
+        """Like RecommendationIndex.recommend (titles only), using approximate search."""
+        ids = self.search(user_interests, k, nprobe=nprobe, rerank=rerank)
+        return [{'title': self.index.titles[idx]} for idx in ids]
+
+def synthetic_descriptions(n_talks, vocabulary_size=20000, words_per_talk=30, seed=42, n_topics=0):
+    """
+    Random talk descriptions with a Zipf-like word distribution, for benchmarks.
+
+    With n_topics > 0, each talk also draws half its words from one topic's
+    own slice of the vocabulary, giving the corpus latent structure for
+    embedding benchmarks.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"term{i}" for i in range(vocabulary_size)])
+    weights = 1.0 / np.arange(1, vocabulary_size + 1)
+    weights /= weights.sum()
+    words = rng.choice(vocabulary, size=(n_talks, words_per_talk), p=weights)
+    if n_topics:
+        topic_size = vocabulary_size // n_topics
+        topic_weights = 1.0 / np.arange(1, topic_size + 1)
+        topic_weights /= topic_weights.sum()
+        topics = rng.integers(0, n_topics, n_talks)
+        offsets = rng.choice(topic_size, size=(n_talks, words_per_talk // 2), p=topic_weights)
+        words[:, :words_per_talk // 2] = vocabulary[topics[:, None] * topic_size + offsets]
+    return [' '.join(row) for row in words]
+
+def benchmark_similarity(n_talks=100000, loop_sample=500, k=5, seed=42):
+    """
+    Compare the old per-talk pearsonr loop with combined_similarity on n_talks
+    synthetic talks. The loop is timed on loop_sample talks and extrapolated.
+    """
+    descriptions = synthetic_descriptions(n_talks, seed=seed)
+    tfidf = TfidfVectorizer(stop_words='english')
+    tfidf_matrix = tfidf.fit_transform(descriptions)
+    user_vector = tfidf.transform([descriptions[0] + ' term1 term2 term3'])
+
+    start = time.perf_counter()
+    cosine_sim = cosine_similarity(user_vector, tfidf_matrix)[0]
+    user_dense = user_vector.toarray()[0]
+    loop_scores = [
+        (cosine_sim[i] + pearsonr(user_dense, tfidf_matrix[i].toarray()[0])[0]) / 2
+        for i in range(loop_sample)
+    ]
+    loop_seconds = (time.perf_counter() - start) * n_talks / loop_sample
+
+    start = time.perf_counter()
+    scores = combined_similarity(user_vector, tfidf_matrix)
+    top = top_k_indices(scores, k)
+    vector_seconds = time.perf_counter() - start
+
+    max_error = np.max(np.abs(np.asarray(loop_scores) - scores[:loop_sample]))
+    print(f"{n_talks} talks, {tfidf_matrix.shape[1]} terms")
+    print(f"Per-talk loop (extrapolated): {loop_seconds:.2f}s")
+    print(f"Sparse vectorized + top-{k}:   {vector_seconds * 1000:.1f}ms "
+          f"({loop_seconds / vector_seconds:.0f}x faster, max abs difference {max_error:.2e})")
+    return top
+
+def benchmark_index(n_talks=100, n_queries=1000, batch_size=1000, k=5, seed=42):
+    """Measure single-query latency and batch throughput of a fitted RecommendationIndex."""
+    descriptions = synthetic_descriptions(n_talks, vocabulary_size=2000, seed=seed)
+    start = time.perf_counter()
+    index = RecommendationIndex.fit(descriptions, [f"Talk {i}" for i in range(n_talks)])
+    fit_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed)
+    queries = [[f"term{i}" for i in rng.integers(0, 200, 3)] for _ in range(max(n_queries, batch_size))]
+
+    start = time.perf_counter()
+    for interests in queries[:n_queries]:
+        index.recommend(interests, k)
+    single_ms = (time.perf_counter() - start) * 1000 / n_queries
+
+    start = time.perf_counter()
+    index.recommend_batch(queries[:batch_size], k)
+    batch_ms = (time.perf_counter() - start) * 1000 / batch_size
+
+    print(f"{n_talks} talks: fit {fit_seconds * 1000:.1f}ms, "
+          f"recommend {single_ms:.3f}ms/query, recommend_batch {batch_ms:.3f}ms/query")
+
+def benchmark_ann(n_talks=100000, n_queries=200, k=10, n_topics=200, n_inserts=1000, seed=42):
+    """
+    Compare EmbeddingIndex with exact RecommendationIndex scoring on synthetic
+    topical talks: build time, per-query latency and recall@k (the fraction of
+    the exact top k that the approximate search also returns).
+    """
+    descriptions = synthetic_descriptions(n_talks + n_inserts, seed=seed, n_topics=n_topics)
+    titles = [f"Talk {i}" for i in range(n_talks + n_inserts)]
+
+    start = time.perf_counter()
+    index = RecommendationIndex.fit(descriptions[:n_talks], titles[:n_talks])
+    ann = EmbeddingIndex(index, seed=seed)
+    print(f"{n_talks} talks: built TF-IDF + SVD + IVF ({len(ann.lists)} lists) in "
+          f"{time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    ann.add(descriptions[n_talks:], titles[n_talks:])
+    print(f"Inserted {n_inserts} talks in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    rng = np.random.default_rng(seed)
+    queries = [descriptions[i].split()[:3] for i in rng.integers(0, n_talks + n_inserts, n_queries)]
+
+    start = time.perf_counter()
+    exact = [set(top_k_indices(index.scores(q), k)) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / n_queries
+    print(f"Exact scoring: {exact_ms:.2f}ms/query")
+
+    for nprobe, rerank_factor in ((8, 0), (32, 0), (8, 10), (8, 50), (8, 100), (32, 100)):
+        start = time.perf_counter()
+        found = [set(ann.search(q, k, nprobe=nprobe, rerank=rerank_factor > 0, rerank_factor=rerank_factor))
+                 for q in queries]
+        ann_ms = (time.perf_counter() - start) * 1000 / n_queries
+        recall = np.mean([len(f & e) / len(e) for f, e in zip(found, exact)])
+        print(f"IVF nprobe={nprobe:<3} rerank={rerank_factor * k:<5}: {ann_ms:.2f}ms/query, recall@{k} {recall:.3f}")
+
 class TEDTalksRecommendationSystem:
-    def __init__(self):
+    def __init__(self, index_path=None):
         # Generate sample TED Talks dataset
         self.generate_dataset()
+        # Recommendation index, fitted (or loaded from index_path) on first use
+        self.index_path = index_path
+        self.index = None
+        # Processed text by description hash, so unchanged descriptions are never reprocessed
+        self.token_cache = {}
         
     def generate_dataset(self):
         """Generate a sample dataset of TED Talks"""
@@ -98,21 +558,36 @@ class TEDTalksRecommendationSystem:
         plt.tight_layout()
         plt.show()
         
-    def text_preprocessing(self):
-        """Preprocess text data"""
-        # Convert to lowercase
-        self.df['processed_description'] = self.df['description'].str.lower()
+    def text_preprocessing(self, processes=None, chunk_size=10000):
+        """
+        Preprocess text data: lowercase, remove punctuation and stop words
+        
+        Only descriptions that are not in the token cache yet are processed,
+        each distinct text once. With processes > 1, large batches are split
+        into chunks of chunk_size and processed in a process pool.
+        """
+        descriptions = self.df['description'].fillna('').tolist()
+        keys = [description_key(text) for text in descriptions]
+        
+        # Collect distinct descriptions that have not been processed before
+        missing = {}
+        for key, text in zip(keys, descriptions):
+            if key not in self.token_cache:
+                missing.setdefault(key, text)
         
-        # Remove punctuation
-        self.df['processed_description'] = self.df['processed_description'].apply(
-            lambda x: x.translate(str.maketrans('', '', string.punctuation))
-        )
+        if missing:
+            texts = list(missing.values())
+            stop_words = english_stopwords()
+            if processes and processes > 1 and len(texts) > chunk_size:
+                chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+                with ProcessPoolExecutor(max_workers=processes) as pool:
+                    results = [text for chunk in pool.map(preprocess_chunk, chunks, repeat(stop_words))
+                               for text in chunk]
+            else:
+                results = preprocess_chunk(texts, stop_words)
+            self.token_cache.update(zip(missing, results))
         
-        # Remove stop words
-        stop_words = set(stopwords.words('english'))
-        self.df['processed_description'] = self.df['processed_description'].apply(
-            lambda x: ' '.join([word for word in x.split() if word not in stop_words])
-        )
+        self.df['processed_description'] = [self.token_cache[key] for key in keys]
         
     def generate_word_cloud(self):
         """Generate word cloud from processed descriptions"""
@@ -128,53 +603,61 @@ class TEDTalksRecommendationSystem:
         plt.title('TED Talks Description Word Cloud')
         plt.show()
         
-    def create_recommendation_system(self, user_interests):
+    def corpus_fingerprint(self):
+        """Fingerprint of the current talks DataFrame (row ids, titles and raw descriptions)"""
+        return corpus_fingerprint(self.df.index, self.df['title'], self.df['description'].fillna(''))
+        
+    def build_index(self):
+        """Fit the recommendation index on the processed descriptions and save it if index_path is set"""
+        if 'processed_description' not in self.df:
+            self.text_preprocessing()
+        self.index = RecommendationIndex.fit(self.df['processed_description'], self.df['title'],
+                                             self.corpus_fingerprint())
+        if self.index_path:
+            self.index.save(self.index_path)
+        return self.index
+        
+    def get_index(self):
         """
-        Create recommendation system using TF-IDF and Cosine Similarity
+        Return the recommendation index, loading or fitting it only the first time
+        
+        A saved index is only reused if it was built from the current talks;
+        otherwise it is rebuilt (and re-saved) so rows never point at stale talks.
+        """
+        if self.index is None:
+            if self.index_path and os.path.exists(self.index_path):
+                index = RecommendationIndex.load(self.index_path)
+                if index.fingerprint == self.corpus_fingerprint():
+                    self.index = index
+                else:
+                    print(f"Index at {self.index_path} was built from a different set of talks, rebuilding it")
+            if self.index is None:
+                self.build_index()
+        return self.index
+        
+    def recommend(self, user_interests, k=5):
+        """
+        Recommend talks using TF-IDF with combined cosine and Pearson similarity
         
         :param user_interests: List of user's interest keywords
+        :param k: Number of talks to recommend
         :return: Recommended TED Talks
         """
-        # TF-IDF Vectorization
-        tfidf = TfidfVectorizer(stop_words='english')
-        tfidf_matrix = tfidf.fit_transform(self.df['processed_description'])
-        
-        # User interests vector
-        user_vector = tfidf.transform([' '.join(user_interests)])
-        
-        # Compute cosine similarity
-        cosine_sim = cosine_similarity(user_vector, tfidf_matrix)[0]
-        
-        # Compute Pearson correlation for additional similarity
-        def pearson_similarity(vec1, vec2):
-            try:
-                return pearsonr(vec1, vec2)[0]
-            except:
-                return 0
-        
-        # Combine similarity scores
-        combined_similarity = [
-            (cosine_sim[i] + pearson_similarity(user_vector.toarray()[0], tfidf_matrix[i].toarray()[0])) / 2 
-            for i in range(len(self.df))
-        ]
+        return self.get_index().recommend(user_interests, k)
         
-        # Rank talks by similarity
-        ranked_talks = sorted(
-            enumerate(combined_similarity), 
-            key=lambda x: x[1], 
-            reverse=True
-        )
-        
-        # Return top 5 recommended talks
-        recommended_talks = [
-            {
-                'title': self.df.iloc[idx]['title'],
-                'similarity_score': score
-            }
-            for idx, score in ranked_talks[:5]
-        ]
+    def recommend_batch(self, users, k=5):
+        """Recommend talks for many users (each a list of interest keywords) at once"""
+        return self.get_index().recommend_batch(users, k)
         
-        return recommended_talks
+    def create_recommendation_system(self, user_interests, k=5):
+        """
+        Create recommendation system using TF-IDF and Cosine Similarity
+        
+        :param user_interests: List of user's interest keywords
+        :param k: Number of talks to recommend
+        :return: Recommended TED Talks
+        """
+        return self.recommend(user_interests, k)
     
     def run_recommendation_system(self, user_interests):
         """Main method to run the entire recommendation system"""
@@ -200,6 +683,24 @@ class TEDTalksRecommendationSystem:
 
 # Example usage
 def main():
+    parser = argparse.ArgumentParser(description="TED Talks recommendation demo")
+    parser.add_argument('--benchmark', type=int, metavar='N_TALKS',
+                        help="Benchmark similarity scoring on N synthetic talks instead of running the demo")
+    parser.add_argument('--benchmark-index', type=int, metavar='N_TALKS',
+                        help="Benchmark query latency of a fitted index on N synthetic talks")
+    parser.add_argument('--benchmark-ann', type=int, metavar='N_TALKS',
+                        help="Benchmark approximate search recall and latency on N synthetic talks")
+    args = parser.parse_args()
+    if args.benchmark_ann:
+        benchmark_ann(args.benchmark_ann)
+        return
+    if args.benchmark:
+        benchmark_similarity(args.benchmark)
+        return
+    if args.benchmark_index:
+        benchmark_index(args.benchmark_index)
+        return
+
     # Initialize recommendation system
     recommender = TEDTalksRecommendationSystem()
     
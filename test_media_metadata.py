@@ -0,0 +1,138 @@
+import math
+import sqlite3
+import threading
+
+import pytest
+
+import media_metadata
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    media_metadata.create_table(conn)
+    yield conn
+    conn.close()
+
+
+def plan(conn, filters):
+    return " | ".join(media_metadata.explain_query(conn, filters))
+
+
+def uses_index(detail, index=None):
+    if "SCAN media_metadata" in detail:
+        return False
+    if index is None:
+        return "USING INDEX" in detail or "USING COVERING INDEX" in detail
+    return f"USING INDEX {index}" in detail or f"USING COVERING INDEX {index}" in detail
+
+
+@pytest.mark.parametrize("filters, index", [
+    ({"date_from": "2024-01-01", "date_to": "2024-02-01"}, "idx_media_created"),
+    ({"file_type": "jpg", "date_from": "2024-01-01"}, "idx_media_format_created"),
+    ({"resolution": "1920x1080"}, "idx_media_dims_created"),
+    ({"file_type": "mp4", "min_size": 1024}, "idx_media_format_size"),
+])
+def test_filters_use_indexes(conn, filters, index):
+    assert uses_index(plan(conn, filters), index)
+
+
+@pytest.mark.parametrize("filters", [
+    {"near": (48.8566, 2.3522), "radius_km": 5.0},
+    {"bbox": (48.0, 2.0, 49.0, 3.0)},
+])
+def test_geo_filters_use_spatial_index(conn, filters):
+    detail = plan(conn, filters)
+    if media_metadata.has_geo_index(conn):
+        assert "SCAN media_metadata" not in detail
+        assert "media_geo VIRTUAL TABLE INDEX" in detail
+    else:
+        assert uses_index(detail, "idx_media_latlon")
+
+
+def test_explain_rejects_bad_dates(conn):
+    with pytest.raises(ValueError):
+        media_metadata.explain_query(conn, {"date_from": "2024-13-45"})
+
+
+def add_point(conn, i, latitude, longitude):
+    metadata = media_metadata.synthetic_metadata(i)
+    metadata["latitude"], metadata["longitude"] = latitude, longitude
+    media_metadata.insert_metadata(conn, metadata)
+
+
+@pytest.mark.parametrize("center", [(48.8566, 2.3522), (60.0, 179.8), (-33.9, -179.9)])
+def test_near_keeps_points_just_inside_radius(conn, center):
+    lat, lon = center
+    # 49.95 km due north and due east/west (across the antimeridian for the last two centres)
+    dlat = math.degrees(49.95 / media_metadata.EARTH_RADIUS_KM)
+    add_point(conn, 0, lat + dlat, lon)
+    for i, sign in enumerate((1, -1), start=1):
+        east = lon
+        while media_metadata.haversine_km(lat, lon, lat, east) < 49.95:
+            east += sign * 1e-4
+        add_point(conn, i, lat, (east + 540) % 360 - 180)
+    add_point(conn, 3, lat + 2 * dlat, lon)
+
+    rows = media_metadata.query_database(conn, {"near": center, "radius_km": 50.0})
+    assert len(rows) == 3
+
+
+def test_bbox_across_antimeridian(conn):
+    add_point(conn, 0, 0.5, 179.5)
+    add_point(conn, 1, 0.5, -179.5)
+    add_point(conn, 2, 0.5, 0.0)
+    rows = media_metadata.query_database(conn, {"bbox": (0.0, 179.0, 1.0, -179.0)})
+    assert len(rows) == 2
+
+
+def test_scan_interrupt_does_not_hang(tmp_path, monkeypatch):
+    for i in range(20):
+        (tmp_path / f"{i}.jpg").write_bytes(b"")
+
+    def interrupt(self, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(media_metadata.ScanProgress, "update", interrupt)
+    conn = sqlite3.connect(str(tmp_path / "media.db"))
+    media_metadata.create_table(conn)
+    outcome = []
+
+    def scan():
+        try:
+            media_metadata.scan_directory(str(tmp_path), conn, workers=2, exif_processes=0, max_pending=2,
+                                          incremental=False, purge=False)
+        except KeyboardInterrupt:
+            outcome.append("interrupted")
+
+    # The walker blocks on a full window of pending files; the interrupt must still release it
+    thread = threading.Thread(target=scan, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert outcome == ["interrupted"]
+
+
+def test_near_zero_radius_is_not_widened(conn):
+    add_point(conn, 0, 48.8566, 2.3522)
+    add_point(conn, 1, 48.8600, 2.3522)
+    rows = media_metadata.query_database(conn, {"near": (48.8566, 2.3522), "radius_km": 0})
+    assert len(rows) == 1
+
+
+def test_near_rejects_negative_radius(conn):
+    with pytest.raises(ValueError):
+        media_metadata.explain_query(conn, {"near": (48.8566, 2.3522), "radius_km": -1.0})
+
+
+def test_migration_backfill_leaves_malformed_values_null():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE media_metadata (id INTEGER PRIMARY KEY AUTOINCREMENT, file_path TEXT UNIQUE, "
+                 "file_format TEXT, resolution TEXT, duration REAL, geolocation TEXT, file_size INTEGER, "
+                 "date_created TEXT, date_modified TEXT)")
+    conn.execute("INSERT INTO media_metadata (file_path, resolution, geolocation) VALUES ('a.jpg', '1920x1080', '1.5,2.5')")
+    conn.execute("INSERT INTO media_metadata (file_path, resolution, geolocation) VALUES ('b.jpg', 'Unknown', 'Unknown')")
+    media_metadata.create_table(conn)
+    rows = conn.execute("SELECT width, height, latitude, longitude FROM media_metadata ORDER BY id").fetchall()
+    assert rows == [(1920, 1080, 1.5, 2.5), (None, None, None, None)]
+    conn.close()
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+import road
+
+
+def movement(vehicle_id, speed, zone, direction="forward"):
+    return {
+        "vehicle_id": vehicle_id,
+        "speed": speed,
+        "direction": direction,
+        "zone": zone,
+        "current_node": "A",
+        "destination_node": "B",
+    }
+
+
+@pytest.mark.parametrize("zone", [None, float("nan"), "Unknown Zone"])
+def test_missing_or_unknown_zone_uses_default_limit(zone):
+    movements = [movement("V1", 25, "School Zone"), movement("V2", 50, zone), movement("V3", 90, zone)]
+    vehicles = road.VehicleColumns.from_records(movements)
+
+    default = road.CONFIG["speed_limits"]["default"]
+    assert vehicles.speed_limit.tolist() == [30, default, default]
+    assert vehicles.violations() == [f"Speed violation (90km/h in {zone})"]
+
+
+def test_known_zones_keep_their_limits():
+    movements = [movement("V1", 65, "MG Road"), movement("V2", 95, "Highway"), movement("V3", 35, "School Zone")]
+    vehicles = road.VehicleColumns.from_records(movements)
+    assert vehicles.violations() == ["Speed violation (65km/h in MG Road)", "Speed violation (35km/h in School Zone)"]
+
+
+def test_congestion_batch_keeps_last_duplicate():
+    city = road.grid_city(3, 3)
+    sequential, batched = road.RouteAdvisor(city), road.RouteAdvisor(city)
+    node_ids = ["0_0", "1_1", "0_0", "2_2", "1_1"]
+    vehicles = [10, 40, 25, 5, 0]
+    for node_id, count in zip(node_ids, vehicles):
+        sequential.update_congestion(node_id, count)
+    nodes = np.array([batched.node_index[n] for n in node_ids])
+    batched.update_congestion_many(node_ids, nodes, np.array(vehicles, dtype=float))
+
+    assert batched.congestion == sequential.congestion
+    assert batched.weights.tolist() == sequential.weights.tolist()
+    assert batched.reverse_graph.data.tolist() == sequential.reverse_graph.data.tolist()
+
+
+def test_itms_components_share_one_node_index():
+    itms = road.ITMS(road.RuleBasedTraffic(), road.grid_city(3, 3))
+    assert itms.emergency_handler.node_index is itms.node_index
+    assert itms.route_advisor.node_index is itms.node_index
+
+    itms.city_graph.add_edge("0_0", "extra")
+    itms.route_advisor.refresh_graph()
+    assert itms.emergency_handler.node_index["extra"] == itms.route_advisor.nodes.index("extra")
+
+
+def test_uncongested_routes_take_fewest_hops():
+    advisor = road.RouteAdvisor(road.grid_city(10, 10))
+    assert advisor.suggest_route("0_0", "0_3") == ["0_0", "0_1", "0_2", "0_3"]
+    # Manhattan distance 9 + 9 hops means 19 nodes on any shortest route
+    assert len(advisor.suggest_route("0_0", "9_9")) == 19
+
+
+def test_congestion_updates_rewrite_matching_csr_rows():
+    city = road.grid_city(6, 6)
+    advisor = road.RouteAdvisor(city)
+    node_ids = ["1_1", "2_3", "4_4"]
+    nodes = np.array([advisor.node_index[n] for n in node_ids])
+    advisor.update_congestion_many(node_ids, nodes, np.array([10.0, 0.0, 30.0]))
+
+    expected = np.repeat(advisor.weights, np.diff(advisor.indptr))
+    assert advisor.reverse_graph.data.tolist() == expected.tolist()
+    assert advisor.weights[advisor.node_index["1_1"]] == pytest.approx(1.0 + 8.0)
+    # The congested node is routed around when an equally short detour exists
+    assert "1_1" not in advisor.suggest_route("0_1", "2_1")